@@ -9,6 +9,7 @@ import ipywidgets as wd
 import matplotlib.pyplot as plt
 import cool_new as cc
 import psychro as psy
+import cav_widget
 import pandas as pd
 
 
@@ -81,8 +82,10 @@ inputs = θo, φo, θI, wI, θIsp, φIsp, mi, UA, Qscab, Qlcab, Qsaux, Qlaux
 cool5 = cc.MxCcRhTzBl(parameters, inputs)
 x = cool5.solve_lin(20.0)
 β, Kw = 0.7, 1e10
-cool5.actual[[2, 4]] = β, Kw
-wd.interact(cool5.CAV_wd, θo=(-5, 15), φo=(0.4, 1), θ3=(20, 28), φ3=(0.4, 1), θIsp=(20, 28), φIsp=(0.4, 1),
+cool5.record[['β', 'Kw']] = β, Kw
+# %matplotlib widget: the chart of CAVWidget is updated in place
+cav = cav_widget.CAVWidget(cool5)
+wd.interact(cav, θo=(-5, 15), φo=(0.4, 1), θ3=(20, 28), w3=(0.005, 0.015, 0.0005), θIsp=(20, 28), φIsp=(0.4, 1),
            mi=(0.06, 3, 0.1), UA=(500, 800, 10), Qsaux=(0, 50_000, 400), Qlaux=(0, 10_000, 200), Qscab=(-70_000, 60_000, 500), Qlcab=(-40_000, 20_000, 500));
 
 
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Annual hourly simulation of the supermarket HVAC system.
+
+Hourly steady states of *cool_new.MxCcRhTzBl* computed from the outdoor
+temperature θo and relative humidity φo read from a weather file.
+The file is streamed in chunks (default one month, 744 h), each chunk is
+solved by *MxCcRhTzBl.solve_lin_batch* and appended to the output CSV,
+so memory use does not depend on the length of the weather file.
+
+Weather files:
+EPW         EnergyPlus weather file; dry bulb temperature (field 7) and
+            relative humidity in % (field 9)
+CSV         columns θo [°C] and φo [-] (names given by θ and φ)
+
+Outputs (one row per hour):
+θ1, w1, ..., θ5, w5     the five state points
+Qsc, Qlc, Qsh           sensible and latent heat of CC, sensible heat of HC
+n_iter, converged       saturation iterations of the hour
+
+*simulate_sequential* steps through the hours one by one instead: each
+hour is warm-started from the saturation temperature θs (and, when m or
+β is controlled, from the m or β) found for the previous hour.
+
+*animate* shows the hourly states on a psychrometric chart.
+"""
+import numpy as np
+import pandas as pd
+import psychro as psy
+import cool_new as cc
+
+
+def read_weather(path, chunksize=744, θ='θo', φ='φo', φ_percent=False):
+    """
+    Reads an hourly weather file chunk by chunk.
+
+    Parameters
+    ----------
+    path        str, CSV or EPW (recognized by the extension .epw)
+    chunksize   number of hours in a chunk
+    θ, φ        names of the temperature and relative humidity columns
+                of a CSV file
+    φ_percent   True if φ is given in % in the CSV file (always in EPW)
+
+    Yields
+    ------
+    DataFrame with columns θo [°C], φo [-]
+    """
+    if str(path).lower().endswith('.epw'):
+        reader = pd.read_csv(path, skiprows=8, header=None, usecols=[6, 8],
+                             chunksize=chunksize)
+        θ, φ, φ_percent = 6, 8, True
+    else:
+        reader = pd.read_csv(path, usecols=[θ, φ], chunksize=chunksize)
+
+    for chunk in reader:
+        θo = chunk[θ].to_numpy(dtype=float)
+        φo = chunk[φ].to_numpy(dtype=float)
+        if φ_percent:
+            φo = φo / 100
+        yield pd.DataFrame({'θo': θo, 'φo': φo})
+
+
+def simulate(model, weather, out, chunksize=744, θs0=cc.θs_0, **kwargs):
+    """
+    Hourly simulation of a year (or any length) of weather data.
+
+    Parameters
+    ----------
+    model       *cool_new.MxCcRhTzBl*; self.actual gives the parameters
+                and inputs which are not in the weather file
+    weather     str, path of the weather file (see *read_weather*)
+    out         str, path of the CSV file of results
+    chunksize   number of hours solved in one call of *solve_lin_batch*
+    θs0         °C, initial guess of saturation temperature
+    kwargs      passed to *read_weather*
+
+    Returns
+    -------
+    n           number of simulated hours
+    """
+    n = 0
+    for chunk in read_weather(weather, chunksize=chunksize, **kwargs):
+        actual = np.tile(model.actual, (len(chunk), 1))
+        records = cc.as_records(actual)
+        records['θo'], records['φo'] = chunk['θo'], chunk['φo']
+        x, n_iter, converged = model.solve_lin_batch(θs0, actual)
+
+        results = pd.DataFrame(x, columns=cc.x_labels,
+                               index=pd.RangeIndex(n, n + len(chunk),
+                                                   name='hour'))
+        results['n_iter'] = n_iter
+        results['converged'] = converged
+        results.to_csv(out, mode='w' if n == 0 else 'a', header=(n == 0))
+        n += len(chunk)
+    return n
+
+
+def _solve_hour(actual, θs0, control, method, bracket):
+    """
+    Solves one hour, with control = None or (variable, value, sp).
+
+    Returns
+    -------
+    x           13 unknowns
+    actual      parameters and inputs (with m or β found)
+    calls       *lin_model* solves (control None) or *solve_lin* calls
+    converged   bool
+    bracket     bracket of m or β for the next hour (brentq) or None
+    """
+    if control is None:
+        x, info = cc.solve_lin(actual, θs0, full_output=True)
+        return (x, actual, info['nit'],
+                info['converged'] and bool(np.isfinite(x).all()), None)
+
+    variable, value, sp = control
+    try:
+        if variable == 'm':
+            x, actual, info = cc.m_ls(actual, value, sp, θs0, method=method,
+                                      bracket=bracket, full_output=True)
+        else:
+            x, actual, info = cc.β_ls(actual, value, sp, θs0, method=method,
+                                      bracket=bracket, full_output=True,
+                                      β0=actual[2])
+    except np.linalg.LinAlgError:       # m = 0 or β = 1
+        return np.full(13, np.nan), actual, 0, False, None
+    return (x, actual, info['nfev'],
+            info['converged'] and bool(np.isfinite(x).all()),
+            info.get('bracket'))
+
+
+def simulate_sequential(model, weather, out, control=None, method='brentq',
+                        compare=False, chunksize=744, θs0=cc.θs_0,
+                        **kwargs):
+    """
+    Hourly simulation warm-started from the solution of the previous hour.
+        Each hour starts from the θs (and m or β, and its bracket) of the
+        previous hour. If the warm start does not converge, the hour is
+        solved again from a cold start: θs0 and the m, β of model.actual.
+
+    Parameters
+    ----------
+    model       *cool_new.MxCcRhTzBl*; self.actual gives the parameters
+                and inputs which are not in the weather file and the
+                cold start of m and β (model.actual is not modified)
+    weather     str, path of the weather file (see *read_weather*)
+    out         str, path of the CSV file of results
+    control     None: *solve_lin* only;
+                (variable, value, sp): variable 'm' or 'β' found by
+                *cool_new.m_ls* or *cool_new.β_ls* for value 'θS' or 'φI'
+                at setpoint sp, e.g. ('m', 'θS', 18)
+    method      'brentq' or 'least_squares', method of m_ls or β_ls
+    compare     True: each hour is also solved from a cold start to count
+                the calls saved by the warm start (doubles the run time)
+    chunksize   number of hours read and written at once
+    θs0         °C, initial guess of saturation temperature (cold start)
+    kwargs      passed to *read_weather*
+
+    Returns
+    -------
+    stats       dict:
+                'hours'         number of simulated hours
+                'calls'         solver calls: *lin_model* solves if
+                                control is None, else *solve_lin* calls
+                'cold_starts'   hours solved again from a cold start
+                'not_converged' hours not converged from either start
+                'calls_cold'    calls of the cold start (if compare)
+                'saved'         calls_cold - calls (if compare)
+
+    Outputs (one row per hour)
+    --------------------------
+    θ1, w1, ..., Qsh    13 unknowns
+    m, β                mass flow rate and by-pass factor
+    calls               solver calls of the hour
+    cold_start          True if the warm start did not converge
+    converged           bool
+    """
+    if control is not None and control[0] not in ('m', 'β'):
+        raise ValueError(f'control variable {control[0]!r} not in '
+                         '{"m", "β"}')
+    cold = np.array(model.actual, dtype=float)
+    warm = cold.copy()
+    θs, bracket = θs0, None
+    stats = {'hours': 0, 'calls': 0, 'cold_starts': 0, 'not_converged': 0,
+             'calls_cold': 0 if compare else None}
+
+    for chunk in read_weather(weather, chunksize=chunksize, **kwargs):
+        rows = []
+        for θo, φo in zip(chunk['θo'], chunk['φo']):
+            warm[5:7] = cold[5:7] = θo, φo
+            x, actual, calls, converged, bracket = _solve_hour(
+                warm, θs, control, method, bracket)
+            cold_start = not converged
+            if cold_start or compare:
+                x_c, actual_c, calls_c, converged_c, bracket_c = _solve_hour(
+                    cold.copy(), θs0, control, method, None)
+                if compare:
+                    stats['calls_cold'] += calls_c
+            if cold_start:
+                x, actual, converged, bracket = (x_c, actual_c, converged_c,
+                                                 bracket_c)
+                calls += calls_c
+                stats['cold_starts'] += 1
+            stats['calls'] += calls
+            stats['not_converged'] += not converged
+
+            if converged:
+                warm, θs = np.array(actual, dtype=float), x[8]
+            else:
+                warm, θs, bracket = cold.copy(), θs0, None
+            rows.append([*x, actual[0], actual[2], calls, cold_start,
+                         converged])
+
+        n = stats['hours']
+        results = pd.DataFrame(rows, columns=[*cc.x_labels, 'm', 'β',
+                                              'calls', 'cold_start',
+                                              'converged'],
+                               index=pd.RangeIndex(n, n + len(rows),
+                                                   name='hour'))
+        results.to_csv(out, mode='w' if n == 0 else 'a', header=(n == 0))
+        stats['hours'] += len(rows)
+
+    if compare:
+        stats['saved'] = stats['calls_cold'] - stats['calls']
+    return stats
+
+
+def states(results, weather, **kwargs):
+    """
+    Hourly state points: outdoor point 0 and points 1 ... 5.
+
+    Parameters
+    ----------
+    results     str, CSV file of *simulate* or *simulate_sequential*
+    weather     str, path of the weather file of the simulation
+    kwargs      passed to *read_weather*
+
+    Returns
+    -------
+    T           array (hours, 6), temperatures °C
+    W           array (hours, 6), humidity ratios kg/kg_da
+    """
+    x = pd.read_csv(results, index_col='hour')
+    o = pd.concat(read_weather(weather, **kwargs), ignore_index=True)
+    o = o.iloc[:len(x)]
+    T = np.column_stack([o['θo'], x[['θ1', 'θ2', 'θ3', 'θ4', 'θ5']]])
+    W = np.column_stack([psy.w(o['θo'], o['φo']),
+                         x[['w1', 'w2', 'w3', 'w4', 'w5']]])
+    return T, W
+
+
+def animate(results, weather, path=None, step=1, fps=25, **kwargs):
+    """
+    Hourly states on a psychrometric chart (*psychro.Chart*, blitted).
+
+    Parameters
+    ----------
+    results     str, CSV file of *simulate* or *simulate_sequential*
+    weather     str, path of the weather file of the simulation
+    path        str, animated image (.webp, .gif, .png) to be saved;
+                None: animation on screen
+    step        one frame every step hours
+    fps         frames per second
+    kwargs      passed to *read_weather*
+
+    Returns
+    -------
+    matplotlib.animation.FuncAnimation if path is None, else None
+    """
+    T, W = states(results, weather, **kwargs)
+    T, W = T[::step], W[::step]
+    chart = psy.Chart(cc.chart_A, animated=True)
+    if path is None:
+        return chart.animate(T, W, interval=1000 / fps)
+    chart.save(path, T, W, fps)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Command-line batch run of scenarios of the supermarket HVAC system.
+
+Scenarios are rows of values of the 17 parameters and inputs of
+*cool_new.MxCcRhTzBl* (names in *cool_new.actual_labels*); the values
+which are not given are taken from a base file. Identical scenarios are
+solved once. The scenarios are solved in chunks by *sweep.run* (batch,
+*MxCcRhTzBl.solve_lin_batch*, in parallel with --workers) and the
+results are written chunk by chunk, one row per scenario in the order
+of the scenario file.
+
+Scenario files:
+CSV         one column per name
+JSON        list of {name: value}, or {"scenarios": [...]}
+YAML        same as JSON (needs PyYAML)
+
+Output files (by extension):
+.csv        CSV, '-' for standard output
+.parquet    Parquet (needs pyarrow)
+
+Exit status: 0 if all scenarios converged, 1 if some did not, 2 for an
+error in the arguments or in the files.
+
+Example
+-------
+    python batch.py scenarios.csv results.csv --base base.json --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import cool_new as cc
+import sweep
+
+
+def _load(path):
+    """Data of a JSON or YAML file."""
+    ext = os.path.splitext(str(path))[1].lower()
+    with open(path, encoding='utf-8') as f:
+        if ext == '.json':
+            return json.load(f)
+        elif ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('YAML files need PyYAML '
+                                  '(pip install pyyaml)') from None
+            return yaml.safe_load(f)
+    raise ValueError(f'file {path!r}: extension not in '
+                     '{".csv", ".json", ".yaml", ".yml"}')
+
+
+def read_scenarios(path):
+    """
+    Reads a scenario file (CSV, JSON or YAML, by extension).
+
+    Returns
+    -------
+    DataFrame, one row per scenario, columns in *cool_new.actual_labels*
+    """
+    if str(path).lower().endswith('.csv'):
+        return pd.read_csv(path)
+    data = _load(path)
+    if isinstance(data, dict):
+        data = data['scenarios']
+    return pd.DataFrame(data)
+
+
+def read_base(path):
+    """Base values {name: value} from a JSON or YAML file (or None)."""
+    return _load(path) if path else {}
+
+
+def complete(scenarios, base):
+    """
+    Scenarios with all the 17 parameters and inputs.
+
+    Returns
+    -------
+    DataFrame, columns *cool_new.actual_labels*
+    """
+    unknown = (set(scenarios.columns) | set(base)) - set(cc.actual_labels)
+    if unknown:
+        raise ValueError(f'unknown parameters or inputs: {sorted(unknown)}')
+    scenarios = scenarios.reindex(columns=cc.actual_labels)
+    scenarios = scenarios.fillna(pd.Series(base, dtype=float))
+    missing = scenarios.columns[scenarios.isna().any()]
+    if len(missing):
+        raise ValueError('values missing in scenarios and base: '
+                         f'{list(missing)}')
+    return scenarios.astype(float)
+
+
+class Writer:
+    """Writes the results chunk by chunk in CSV or Parquet."""
+    def __init__(self, path):
+        self.path = path
+        self.parquet = str(path).lower().endswith('.parquet')
+        self.writer = None
+        self.header = True
+
+    def write(self, results):
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError('Parquet output needs pyarrow '
+                                  '(pip install pyarrow)') from None
+            table = pa.Table.from_pandas(results)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            out = sys.stdout if self.path == '-' else self.path
+            results.to_csv(out, mode='w' if self.header else 'a',
+                           header=self.header)
+            self.header = False
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def run(scenarios, out, base=None, max_workers=1, chunksize=100_000,
+        θs0=cc.θs_0):
+    """
+    Solves the scenarios and writes the results: the values given in
+    scenarios (set points θ3, w3 renamed by *sweep.sp_labels*), the 13
+    unknowns *cool_new.x_labels*, n_iter and converged.
+
+    Parameters
+    ----------
+    scenarios   DataFrame, one row per scenario
+    out         str, path of the output file (.csv, .parquet or '-')
+    base        dict {name: value} of the values not in scenarios
+    max_workers number of worker processes of *sweep.run*; 1: batch in
+                the calling process
+    chunksize   number of scenarios solved and written at once
+    θs0         °C, initial guess of saturation temperature
+
+    Returns
+    -------
+    stats       dict: 'scenarios', 'unique', 'not_converged'
+    """
+    given = scenarios.rename(columns=sweep.sp_labels)
+    scenarios = complete(scenarios, base or {})
+    if scenarios.empty:
+        raise ValueError('no scenarios')
+    codes, unique = pd.factorize(pd.MultiIndex.from_frame(scenarios))
+    unique = unique.to_frame(index=False, name=cc.actual_labels)
+    actual = unique.to_numpy()[0]
+    model = cc.MxCcRhTzBl(actual[:5], actual[5:])
+    workers = max_workers or os.cpu_count()
+    solved = np.full((len(unique), len(cc.x_labels) + 2), np.nan)
+    done = np.zeros(len(unique), dtype=bool)
+
+    writer = Writer(out)
+    try:
+        for start in range(0, len(scenarios), chunksize):
+            c = codes[start:start + chunksize]
+            new = np.unique(c[~done[c]])
+            if new.size:
+                results = sweep.run(model, unique.iloc[new], max_workers,
+                                    chunksize=-(-new.size // workers),
+                                    θs0=θs0)
+                solved[new] = results[[*cc.x_labels, 'n_iter',
+                                       'converged']].to_numpy(dtype=float)
+                done[new] = True
+            results = pd.DataFrame(solved[c], columns=[*cc.x_labels,
+                                                       'n_iter',
+                                                       'converged'],
+                                   index=pd.RangeIndex(start,
+                                                       start + len(c),
+                                                       name='scenario'))
+            results = pd.concat([given.iloc[start:start + len(c)]
+                                 .set_index(results.index), results], axis=1)
+            results = results.astype({'n_iter': int, 'converged': bool})
+            writer.write(results)
+    finally:
+        writer.close()
+    return {'scenarios': len(scenarios), 'unique': len(unique),
+            'not_converged': int(len(scenarios)
+                                 - solved[codes, -1].astype(bool).sum())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Batch run of scenarios of cool_new.MxCcRhTzBl.')
+    parser.add_argument('scenarios', help='CSV, JSON or YAML scenario file')
+    parser.add_argument('out', help="results, .csv, .parquet or '-'")
+    parser.add_argument('--base', help='JSON or YAML file of the values '
+                        'not given in the scenarios')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes (default 1: batch in this '
+                        'process; 0: number of CPUs)')
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help='scenarios solved and written at once')
+    parser.add_argument('--θs0', type=float, default=cc.θs_0,
+                        help='°C, initial guess of saturation temperature')
+    args = parser.parse_args(argv)
+
+    try:
+        stats = run(read_scenarios(args.scenarios), args.out,
+                    read_base(args.base), args.workers or None,
+                    args.chunksize, args.θs0)
+    except (OSError, ValueError, KeyError, ImportError) as e:
+        print(f'batch: error: {e}', file=sys.stderr)
+        return 2
+    print(f"batch: {stats['scenarios']} scenarios, {stats['unique']} "
+          f"unique, {stats['not_converged']} not converged",
+          file=sys.stderr)
+    return 1 if stats['not_converged'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
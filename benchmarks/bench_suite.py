@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite of *psychro* and of the solvers of *cool_new*.
+
+Cases:
+import      import of cool_new and sweep in a new interpreter (start-up
+            of the worker processes)
+psychro     pvs, w, wsp on a scalar and on arrays of 1e3 ... 1e7 values
+solver      lin_model, solve_lin, m_ls, β_ls per call (m_ls, β_ls for the
+            supply temperature θS with the indoor temperature controller
+            off, Kθ = 1e-3, and both methods)
+annual      8760 h of synthetic weather by *annual.simulate* (batch) and
+            *annual.simulate_sequential* (warm-started, hour by hour)
+sweep       100 stores x 8760 h by *sweep.run*
+
+Each case gives the best time of repeated runs (s per call, per value
+or per hour); the annual run and the sweep are also reported in hours
+simulated per second. The results are compared with the baseline stored
+in benchmarks/baseline.json; a case slower than tolerance x baseline is
+a regression (exit status 1). The baseline records whether it was run
+with --quick; a run of the other size is not compared with it.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite            # compare with baseline
+    python -m benchmarks.bench_suite --save     # store new baseline
+    python -m benchmarks.bench_suite --quick    # smaller sizes
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+import psychro as psy
+import cool_new as cc
+import annual
+import sweep
+from benchmarks.bench_wsp import demo_model
+
+baseline_path = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def best(f, repeat=5):
+    """Best time of f() [s] over repeat runs (several calls if fast)."""
+    number, _ = timeit.Timer(f).autorange()
+    return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+
+def synthetic_weather(path, hours=8760, seed=0):
+    """CSV of hourly θo, φo: annual and daily cycles plus noise."""
+    rng = np.random.default_rng(seed)
+    h = np.arange(hours)
+    θo = (10 - 12 * np.cos(2 * np.pi * h / 8760)
+          + 5 * np.sin(2 * np.pi * h / 24) + rng.normal(0, 1, hours))
+    φo = np.clip(0.7 + 0.2 * np.sin(2 * np.pi * h / 24 + 1)
+                 + rng.normal(0, 0.05, hours), 0.2, 1)
+    pd.DataFrame({'θo': θo, 'φo': φo}).to_csv(path, index=False)
+
+
+def bench_import(repeat=5):
+    """s to import cool_new and sweep in a new interpreter."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for module in ('cool_new', 'sweep'):
+        code = ('import time; t0 = time.perf_counter(); '
+                f'import {module}; print(time.perf_counter() - t0)')
+        results[f'import {module}'] = min(
+            float(subprocess.run([sys.executable, '-c', code], cwd=root,
+                                 capture_output=True, check=True,
+                                 text=True).stdout)
+            for _ in range(repeat))
+    return results
+
+
+def bench_psychro(sizes):
+    """s per value of pvs, w, wsp on a scalar and on arrays."""
+    results = {}
+    for n in [1] + sizes:
+        t = 20.0 if n == 1 else np.linspace(-10, 45, n)
+        for name, f in (('pvs', lambda: psy.pvs(t)),
+                        ('w', lambda: psy.w(t, 0.5)),
+                        ('wsp', lambda: psy.wsp(t))):
+            results[f'psychro.{name}[{n:.0e}]'] = best(f) / n
+    return results
+
+
+def bench_solver():
+    """s per call of lin_model, solve_lin, m_ls, β_ls."""
+    model = demo_model()
+    actual = model.actual.copy()
+    results = {
+        'lin_model': best(lambda: cc.lin_model(actual, cc.θs_0)),
+        'solve_lin': best(lambda: cc.solve_lin(actual, cc.θs_0)),
+        'solve_lin_newton': best(
+            lambda: cc.solve_lin(actual, cc.θs_0, method='newton'))}
+    actual[3] = 1e-3                    # Kθ: θS free
+    for method in ('least_squares', 'brentq'):
+        results[f'm_ls_{method}'] = best(
+            lambda: cc.m_ls(actual, 'θS', 23, method=method), repeat=3)
+        results[f'β_ls_{method}'] = best(
+            lambda: cc.β_ls(actual, 'θS', 30, method=method), repeat=3)
+    return results
+
+
+def bench_annual(weather, hours):
+    """s per hour of the annual run, batch and sequential."""
+    model = demo_model()
+    out = os.path.join(os.path.dirname(weather), 'annual.csv')
+    t0 = time.perf_counter()
+    annual.simulate(model, weather, out)
+    t1 = time.perf_counter()
+    annual.simulate_sequential(model, weather, out)
+    t2 = time.perf_counter()
+    return {'annual.simulate': (t1 - t0) / hours,
+            'annual.simulate_sequential': (t2 - t1) / hours}
+
+
+def bench_sweep(weather, stores, max_workers):
+    """s per store-hour of the sweep of stores over the weather."""
+    rng = np.random.default_rng(1)
+    model = demo_model()
+    hourly = pd.read_csv(weather)
+    design = pd.DataFrame({'UA': rng.uniform(500, 800, stores),
+                           'mi': rng.uniform(0.06, 0.3, stores),
+                           'Qsaux': rng.uniform(4, 8, stores),
+                           'Qscab': rng.uniform(-70, -50, stores)})
+    scenarios = design.merge(hourly, how='cross')
+    t0 = time.perf_counter()
+    sweep.run(model, scenarios, max_workers=max_workers, chunksize=8760)
+    return {'sweep.run': (time.perf_counter() - t0) / len(scenarios)}
+
+
+def run(quick=False, max_workers=None):
+    """
+    Runs all cases.
+
+    Returns
+    -------
+    dict {case: s per call, per value or per hour}
+    """
+    sizes = [1000, 100_000] if quick else [1000, 10_000, 100_000,
+                                           1_000_000, 10_000_000]
+    hours, stores = (744, 10) if quick else (8760, 100)
+    results = bench_import()
+    results.update(bench_psychro(sizes))
+    results.update(bench_solver())
+    with tempfile.TemporaryDirectory() as tmp:
+        weather = os.path.join(tmp, 'weather.csv')
+        synthetic_weather(weather, hours)
+        results.update(bench_annual(weather, hours))
+        results.update(bench_sweep(weather, stores, max_workers))
+    return results
+
+
+def machine():
+    """Description of the machine and of the versions."""
+    return {'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Table of the results and of the baseline.
+
+    Returns
+    -------
+    DataFrame: time [µs], hours/s (annual, sweep), baseline [µs],
+    ratio = time / baseline, regression = ratio > tolerance
+    """
+    df = pd.DataFrame({'time [µs]': pd.Series(results) * 1e6})
+    hourly = df.index.str.startswith(('annual', 'sweep'))
+    df['hours/s'] = np.where(hourly, 1e6 / df['time [µs]'], np.nan)
+    df['baseline [µs]'] = pd.Series(baseline) * 1e6
+    df['ratio'] = df['time [µs]'] / df['baseline [µs]']
+    df['regression'] = df['ratio'] > tolerance
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--save', action='store_true',
+                        help='store the results as baseline')
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller arrays, 744 h, 10 stores')
+    parser.add_argument('--baseline', default=baseline_path,
+                        help='JSON file of the baseline')
+    parser.add_argument('--tolerance', type=float, default=1.3,
+                        help='regression if time > tolerance x baseline')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes of the sweep')
+    args = parser.parse_args(argv)
+
+    results = run(args.quick, args.workers)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('quick', False) == args.quick:
+            baseline = stored['results']
+        else:
+            print(f"baseline {args.baseline} run with quick="
+                  f"{stored.get('quick', False)}, not compared",
+                  file=sys.stderr)
+    df = compare(results, baseline, args.tolerance)
+    with pd.option_context('display.float_format', '{:,.3f}'.format,
+                           'display.width', 120,
+                           'display.max_columns', None):
+        print(df)
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine(), 'quick': args.quick,
+                       'results': results}, f, indent=1, ensure_ascii=False)
+        return 0
+    return int(df['regression'].any())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
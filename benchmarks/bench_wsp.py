@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Iterations of *MxCcRhTzBl.solve_lin* with the derivative of the saturation
+curve *psychro.wsp*:
+before      Tetens slope with (p - exp_t)**2, inconsistent with psychro.pvs
+after       derivative of psychro.w(ts, 1), consistent with psychro.pvs
+
+Sweeps over -10 ... 40 °C of:
+θs0         initial guess of the saturation temperature
+θo          outdoor temperature (initial guess cool_new.θs_0)
+
+Run from the repository root:
+    python -m benchmarks.bench_wsp
+"""
+import numpy as np
+import psychro as psy
+import cool_new as cc
+
+θ_range = np.arange(-10, 41, 5)
+
+
+def wsp_tetens(ts, p=101325):
+    """Derivative of the saturation curve before the correction."""
+    Mv = 18.01528       # [kg/kmol] vapor molaire mass
+    Mda = 28.9645       # [kg/kmol] air molaire mass
+    exp_t = np.exp(17.2694*ts/(ts + 238.3))
+    wp = Mv/Mda*p*2.51354e6*exp_t/((ts + 238.3)**2*(p - exp_t)**2)
+    return wp
+
+
+def demo_model():
+    """Model of the demo hour of cool_new (θo = -3.8 °C, φo = 0.7)."""
+    m = 1.601
+    parameters = m, 0.1 * m, 0.7, 1e9, 1e9
+    inputs = (-3.8, 0.7, 24.0, psy.w(24.0, 0.55), 24.0, 0.55, 0.127, 675,
+              6.124, 7.44, -60.509, -39.537)
+    return cc.MxCcRhTzBl(parameters, inputs)
+
+
+def iterations(model, wsp):
+    """Iterations of solve_lin for the sweeps of θs0 and θo."""
+    psy_wsp, psy.wsp = psy.wsp, wsp
+    try:
+        nit_θs0 = [model.solve_lin(θs0, full_output=True)[1]['nit']
+                   for θs0 in θ_range]
+        nit_θo = []
+        for θo in θ_range:
+            model.actual[5] = θo
+            nit_θo.append(model.solve_lin(cc.θs_0, full_output=True)[1]['nit'])
+        model.actual[:] = model.design
+    finally:
+        psy.wsp = psy_wsp
+    return np.array(nit_θs0), np.array(nit_θo)
+
+
+def main():
+    model = demo_model()
+    before = iterations(model, wsp_tetens)
+    after = iterations(model, psy.wsp)
+    for name, b, a in zip(['θs0', 'θo'], before, after):
+        print(f'\nsweep of {name} [°C]   before  after')
+        for θ, nb, na in zip(θ_range, b, a):
+            print(f'{θ:12.0f} {nb:14d} {na:6d}')
+        print(f'{"total":>12} {b.sum():14d} {a.sum():6d}')
+
+
+if __name__ == '__main__':
+    main()
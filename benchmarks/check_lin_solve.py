@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Checks of the closed-form solution *cool_new.lin_solve*.
+
+Cases:
+accuracy    random batches of operating points around the demo model:
+            lin_solve against np.linalg.solve of *cool_new.lin_system*,
+            max relative difference (round-off, about 1e-14)
+singular    m = 0 or β = 1 (singular matrix): the rows are flagged not
+            converged by *MxCcRhTzBl.solve_lin_batch*, at the first pass
+
+Exit status 1 if a check fails.
+
+Run from the repository root:
+    python -m benchmarks.check_lin_solve
+"""
+import sys
+import warnings
+
+import numpy as np
+import cool_new as cc
+from benchmarks.bench_wsp import demo_model
+
+rtol = 1e-11    # max relative difference of lin_solve and np.linalg.solve
+
+# ranges of the random operating points
+ranges = {'m': (0.5, 5), 'β': (0, 0.95), 'Kθ': (1, 1e10), 'Kw': (1, 1e10),
+          'θo': (-10, 35), 'φo': (0.2, 1), 'θIsp': (20, 26),
+          'φIsp': (0.4, 0.7), 'mi': (0, 0.5), 'UA': (300, 1000),
+          'Qsaux': (0, 1e4), 'Qlaux': (0, 1e4), 'Qscab': (-1e5, 0),
+          'Qlcab': (-5e4, 0)}
+
+
+def random_actual(model, N, rng):
+    """N random operating points around model.actual, mo = 0 ... m."""
+    actual = np.tile(model.actual, (N, 1))
+    for k, (lo, hi) in ranges.items():
+        j = cc.actual_labels.index(k)
+        if k in ('Kθ', 'Kw'):   # log-uniform
+            actual[:, j] = np.exp(rng.uniform(np.log(lo), np.log(hi), N))
+        else:
+            actual[:, j] = rng.uniform(lo, hi, N)
+    actual[:, 1] = rng.uniform(0, 1, N) * actual[:, 0]
+    return actual
+
+
+def accuracy(model, batches=20, N=1000, seed=0):
+    """Max relative difference of lin_solve and np.linalg.solve."""
+    rng = np.random.default_rng(seed)
+    error = 0.
+    for _ in range(batches):
+        actual = random_actual(model, N, rng)
+        θs0 = rng.uniform(cc.θs_min, 40, N)
+        A, b = cc.lin_system(actual, θs0)
+        x = np.linalg.solve(A, b[..., None])[..., 0]
+        d = np.abs(cc.lin_solve(actual, θs0) - x) / np.abs(x).max(axis=0)
+        error = max(error, d.max())
+    return error
+
+
+def singular(model):
+    """
+    converged, n_iter, finite rows of solve_lin_batch for the demo point,
+    β = 1, m = 0, m = mo = 0.
+    """
+    actual = np.tile(model.actual, (4, 1))
+    actual[1, 2] = 1
+    actual[2, 0] = 0
+    actual[3, :2] = 0
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        x, n_iter, converged = model.solve_lin_batch(cc.θs_0, actual)
+    return converged, n_iter, np.isfinite(x).all(axis=1)
+
+
+def main():
+    model = demo_model()
+    error = accuracy(model)
+    ok = error <= rtol
+    print(f'accuracy: max relative difference {error:.2e} '
+          f'(tolerance {rtol:.0e}) {"ok" if ok else "FAILED"}')
+
+    converged, n_iter, finite = singular(model)
+    for name, c, n, f in zip(('demo', 'β = 1', 'm = 0', 'm = mo = 0'),
+                             converged, n_iter, finite):
+        print(f'{name:>12}: converged {c!s:5} passes {n:3d} finite {f}')
+    ok_singular = (converged[0] and not converged[1:].any()
+                   and (n_iter[1:] == 1).all())
+    print(f'singular: {"ok" if ok_singular else "FAILED"}')
+    return 0 if ok and ok_singular else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Non-blocking Jupyter widget of the constant air volume (CAV) system.
+
+*CAVWidget* is a faster replacement of *MxCcRhTzBl.CAV_wd* for
+ipywidgets.interact (with the ipympl backend, %matplotlib widget):
+- the slider values are quantized and the results of *solve_lin* are
+  cached (least recently used) for the quantized values and the
+  parameters m, mo, β, Kθ, Kw of the model;
+- the model is solved in a background thread; while it is busy, only the
+  last request is kept, the stale ones are dropped;
+- the psychrometric chart is drawn once, then only the process lines,
+  the point numbers and the text of the results are updated, in the
+  event loop of the figure (a timer polls for the last result; matplotlib
+  artists are not thread-safe).
+
+Example
+-------
+>>> cav = CAVWidget(model)
+>>> wd.interact(cav, θo=(-5, 15), φo=(0.4, 1), ...)
+"""
+import functools
+import threading
+
+import numpy as np
+import psychro as psy
+import cool_new as cc
+
+# slider inputs of CAV_wd, elements 5 ... 16 of MxCcRhTzBl.actual
+input_labels = cc.actual_labels[5:]
+
+# quantum of the slider values for the cache keys
+slider_quanta = {'θo': 0.1, 'φo': 0.01, 'θ3': 0.1, 'w3': 0.1e-3,
+                 'θIsp': 0.1, 'φIsp': 0.01, 'mi': 0.01, 'UA': 1,
+                 'Qsaux': 10, 'Qlaux': 10, 'Qscab': 10, 'Qlcab': 10}
+
+
+class CAVWidget:
+    """
+    Cached, non-blocking CAV_wd for a Jupyter widget.
+
+    Parameters
+    ----------
+    model       *cool_new.MxCcRhTzBl*; the parameters m, mo, β, Kθ, Kw
+                are read from model.actual at each request (model is
+                not modified)
+    quanta      dict {input: quantum} updating *slider_quanta*
+    maxsize     number of results kept in the cache
+    θs0         °C, initial guess of saturation temperature
+
+    interval    ms, period of the timer drawing the last result
+
+    Attributes
+    ----------
+    fig, ax     figure and axes of the psychrometric chart
+    """
+    def __init__(self, model, quanta=None, maxsize=1024, θs0=40,
+                 interval=50):
+        import matplotlib.pyplot as plt
+
+        self.model = model
+        quanta = {**slider_quanta, **(quanta or {})}
+        self.quanta = np.array([quanta[k] for k in input_labels])
+        self.θs0 = θs0
+        self.solve = functools.lru_cache(maxsize=maxsize)(self._solve)
+
+        self._pending = None    # last request not yet computed
+        self._result = None     # last result not yet drawn
+        self._busy = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+        self.fig, self.ax = plt.subplots()
+        self._background()
+        self.lines = [self.ax.plot([], [], linewidth=3)[0]
+                      for _ in range(cc.chart_A.shape[0])]    # processes
+        self.numbers = [self.ax.text(0, 0, str(j), visible=False)
+                        for j in range(cc.chart_A.shape[1])]  # points
+        self.text = self.ax.text(0.02, 0.98, '', transform=self.ax.transAxes,
+                                 verticalalignment='top', family='monospace')
+        self.timer = self.fig.canvas.new_timer(interval=interval)
+        self.timer.add_callback(self._poll)
+        self.timer.start()
+
+    def _background(self, t_range=np.arange(-10, 50, 0.5)):
+        """Saturation and relative humidity curves, drawn once."""
+        ax = self.ax
+        ax.yaxis.tick_right()
+        ax.yaxis.set_label_position("right")
+        ax.set_xlabel(r'Temperature $\theta$ [°C]')
+        ax.set_ylabel(r'Humidity ratio w [kg/kg]')
+        ax.grid(True)
+        ax.plot(t_range, psy.w(t_range, 1), linewidth=2)    # saturation curve
+        for φ in np.arange(0.2, 1, 0.2):                    # relative humidity
+            w = psy.w(t_range, φ)
+            ax.plot(t_range, w, linewidth=0.5)
+            ax.annotate(f'{100 * φ:3.0f} %', xy=(t_range[-1] - 3, w[-1]))
+        ax.set_xlim(t_range[0], t_range[-1])
+        ax.set_ylim(0, 0.03)
+
+    def __call__(self, θo=-3.7, φo=0.7, θ3=24, w3=0.0104, θIsp=24, φIsp=0.55,
+                 mi=0.127, UA=675, Qsaux=6.124, Qlaux=7.44, Qscab=-60.509,
+                 Qlcab=-39.537):
+        """
+        Requests the solution for the slider values (see *CAV_wd*);
+        returns at once, the solution is computed by the background thread
+        and drawn by the timer.
+        """
+        values = np.array([θo, φo, θ3, w3, θIsp, φIsp,
+                           mi, UA, Qsaux, Qlaux, Qscab, Qlcab], dtype=float)
+        key = (tuple(np.array(self.model.actual[:5], dtype=float).tolist()),
+               tuple(np.round(values / self.quanta).astype(int).tolist()))
+        with self._condition:
+            self._pending = key         # replaces a stale request
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _solve(self, key):
+        """
+        Solution for the parameters and the quantized slider values
+        (cached by self.solve).
+
+        Returns
+        -------
+        x           13 unknowns of *cool_new.solve_lin*
+        info        dict of *cool_new.solve_lin*
+        """
+        return cc.solve_lin(self._actual(key), self.θs0, full_output=True)
+
+    def _actual(self, key):
+        """Parameters and inputs (17,) of a cache key."""
+        parameters, sliders = key
+        return np.concatenate([parameters, np.array(sliders) * self.quanta])
+
+    def _run(self):
+        """Background thread: solves the last request for the timer."""
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._busy = False
+                    self._condition.notify_all()
+                    self._condition.wait()
+                key, self._pending = self._pending, None
+                self._busy = True
+            x, info = self.solve(key)
+            with self._condition:
+                if self._pending is None:   # else: keep only the last request
+                    self._result = x, info, self._actual(key)
+
+    def _poll(self):
+        """Timer (event loop): draws the last result, if any."""
+        with self._condition:
+            result, self._result = self._result, None
+        if result is not None:
+            self._draw(*result)
+
+    def _draw(self, x, info, actual):
+        """Updates the process lines, point numbers and results."""
+        θo, φo = actual[5:7]
+        θ = np.append(θo, x[0:10:2])
+        w = np.append(psy.w(θo, φo), x[1:10:2])
+        for line, a in zip(self.lines, cc.chart_A):
+            k = np.nonzero(a)[0]
+            line.set_data(θ[k], w[k])
+        for number, θj, wj in zip(self.numbers, θ, w):
+            number.set_position((θj, wj))
+            number.set_visible(True)
+        m, mo = actual[:2]
+        self.text.set_text(
+            f'm = {m:.3f} kg/s, mo = {mo:.3f} kg/s\n'
+            f'Qsc = {x[10] / 1000:.2f} kW, Qlc = {x[11] / 1000:.2f} kW, '
+            f'Qsh = {x[12] / 1000:.2f} kW'
+            + ('' if info['converged'] else f"\n{info['status']}"))
+        self.fig.canvas.draw_idle()
+
+    def wait(self, timeout=None):
+        """
+        Waits until the last request is solved, then draws it (call from
+        the thread of the event loop); False if timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._pending is None and not self._busy,
+                    timeout):
+                return False
+        self._poll()
+        return True
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed control map of the supermarket HVAC system.
+
+The m (or β) found by *cool_new.m_ls* (or *cool_new.β_ls*) for a set
+point is tabulated on a grid of outdoor temperature θo, outdoor relative
+humidity φo and loads Qscab, Qsaux; the other parameters and inputs are
+those of the model. The grid is solved once, in parallel, by the full
+solver and stored in a compressed .npz file. Queries are answered by
+multilinear interpolation in the grid, with an estimate of the
+interpolation error; outside the grid (or in cells with nodes which did
+not converge) the exact solver is called.
+
+The error estimate of a node is sum_k h_k²/8·|∂²u/∂x_k²| (bound of the
+error of linear interpolation, second derivatives by divided
+differences on the grid; unknown next to nodes which did not converge);
+a query gives the largest estimate of the nodes of its cell.
+*ControlMap.check* compares the map with the exact solver at random
+points.
+
+Example
+-------
+>>> cmap = build(model, ('m', 'θS', 18), θo=np.arange(-10, 36, 5),
+...              φo=[0.3, 0.5, 0.7, 0.9], Qscab=[-70, -60, -50],
+...              Qsaux=[4, 6, 8])
+>>> cmap.save('map.npz')
+>>> cmap = ControlMap.load('map.npz')
+>>> m, error, exact = cmap.query(θo=12.3, φo=0.64, Qscab=-58, Qsaux=6.1)
+"""
+import bisect
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cool_new as cc
+
+axis_labels = ('θo', 'φo', 'Qscab', 'Qsaux')
+
+_i = [cc.actual_labels.index(k) for k in axis_labels]
+_actual = None      # parameters and inputs of the worker process
+_control = None     # control of the worker process
+
+
+def _init(actual, control):
+    """Parameters, inputs and control of the worker process."""
+    global _actual, _control
+    _actual, _control = np.array(actual, dtype=float), control
+
+
+def _solve_nodes(actual, control, nodes):
+    """
+    m or β for the rows of nodes (θo, φo, Qscab, Qsaux) by the full
+    solver; nan if not converged.
+
+    Parameters
+    ----------
+    actual      array (17,), parameters and inputs, see *ControlMap*
+    control     (variable, value, sp), see *ControlMap*
+    nodes       array (N, 4) of θo, φo, Qscab, Qsaux
+    """
+    variable, value, sp = control
+    ls, k = (cc.m_ls, 0) if variable == 'm' else (cc.β_ls, 2)
+    u = np.full(len(nodes), np.nan)
+    for n, node in enumerate(nodes):
+        actual_n = np.array(actual, dtype=float)
+        actual_n[_i] = node
+        try:
+            x, actual_n, info = ls(actual_n, value, sp, method='brentq',
+                                   full_output=True)
+        except np.linalg.LinAlgError:       # m = 0 or β = 1
+            continue
+        if info['converged'] and np.isfinite(x).all():
+            u[n] = actual_n[k]
+    return u
+
+
+def _solve(nodes):
+    """*_solve_nodes* in the worker process (see *_init*)."""
+    return _solve_nodes(_actual, _control, nodes)
+
+
+def _error(axes, values):
+    """Error estimate of linear interpolation at the nodes."""
+    error = np.zeros_like(values)
+    for k, ax in enumerate(axes):
+        if len(ax) < 3:
+            continue
+        u = np.moveaxis(values, k, 0)
+        h = np.diff(ax).reshape((-1,) + (1,) * (values.ndim - 1))
+        d2 = 2 * (np.diff(u[1:], axis=0) / h[1:] - np.diff(u[:-1], axis=0)
+                  / h[:-1]) / (h[1:] + h[:-1])
+        e = np.maximum(h[1:], h[:-1])**2 / 8 * np.abs(d2)
+        e = np.concatenate([e[:1], e, e[-1:]])      # end nodes
+        error += np.moveaxis(e, 0, k)
+    return error
+
+
+class ControlMap:
+    """
+    Gridded control map: m or β as a function of θo, φo, Qscab, Qsaux.
+
+    Parameters
+    ----------
+    actual      array (17,), parameters and inputs (*cool_new.actual_labels*)
+                of the map (values of axis_labels not used)
+    control     (variable, value, sp): variable 'm' or 'β' found by
+                *cool_new.m_ls* or *cool_new.β_ls* for value 'θS' or 'φI'
+                at setpoint sp, e.g. ('m', 'θS', 18)
+    axes        4 increasing arrays, grid of θo, φo, Qscab, Qsaux
+    values      array (len(axes[0]), ..., len(axes[3])) of m or β,
+                nan where the solver did not converge
+    """
+    def __init__(self, actual, control, axes, values):
+        self.actual = np.array(actual, dtype=float)
+        self.control = (control[0], control[1], float(control[2]))
+        self.axes = [np.asarray(ax, dtype=float) for ax in axes]
+        self.values = np.asarray(values, dtype=float)
+        self.error = _error(self.axes, self.values)
+        self.lo = np.array([ax[0] for ax in self.axes])
+        self.hi = np.array([ax[-1] for ax in self.axes])
+        # flat indexes of the 2**4 nodes of a cell relative to its first node
+        self._strides = np.array(self.values.strides) // self.values.itemsize
+        self._corners = np.array(list(itertools.product(
+            (0, 1), repeat=len(self.axes)))) @ self._strides
+        # lists of floats for the queries of single points (*query*)
+        self._lists = ([ax.tolist() for ax in self.axes],
+                       self._strides.tolist(), self._corners.tolist(),
+                       self.values.ravel().tolist(),
+                       self.error.ravel().tolist())
+
+    def save(self, path):
+        """Saves the map to a compressed .npz file."""
+        variable, value, sp = self.control
+        np.savez_compressed(path, actual=self.actual, variable=variable,
+                            value=value, sp=sp, values=self.values,
+                            **dict(zip(axis_labels, self.axes)))
+
+    @classmethod
+    def load(cls, path):
+        """Map saved by *save*."""
+        with np.load(path, allow_pickle=False) as f:
+            return cls(f['actual'], (str(f['variable']), str(f['value']),
+                                     float(f['sp'])),
+                       [f[k] for k in axis_labels], f['values'])
+
+    def interpolate(self, points):
+        """
+        Multilinear interpolation in the grid.
+
+        Parameters
+        ----------
+        points      array (N, 4) of θo, φo, Qscab, Qsaux, in the grid
+
+        Returns
+        -------
+        u           array (N,), m or β (nan if a node of the cell is nan)
+        error       array (N,), error estimate of u (inf if unknown)
+        """
+        points = np.atleast_2d(points)
+        base = 0
+        weights = np.ones((len(points), 1))
+        for ax, p, stride in zip(self.axes, points.T, self._strides):
+            j = np.clip(np.searchsorted(ax, p, side='right') - 1,
+                        0, len(ax) - 2)
+            t = (p - ax[j]) / (ax[j + 1] - ax[j])
+            base = base + j * stride
+            weights = (weights[:, :, None]
+                       * np.stack([1 - t, t], -1)[:, None, :]
+                       ).reshape(len(points), -1)
+        nodes = base[:, None] + self._corners
+        u = np.einsum('ij,ij->i', weights, self.values.ravel()[nodes])
+        error = np.fmax.reduce(self.error.ravel()[nodes], axis=1)
+        return u, np.where(np.isnan(error), np.inf, error)
+
+    def _interpolate_point(self, point):
+        """
+        *interpolate* for one point in the grid, on floats: a few µs
+        instead of the overhead of the array operations.
+        """
+        axes, strides, corners, values, error = self._lists
+        base, weights = 0, [1.]
+        for ax, p, stride in zip(axes, point, strides):
+            j = min(max(bisect.bisect_right(ax, p) - 1, 0), len(ax) - 2)
+            t = (p - ax[j]) / (ax[j + 1] - ax[j])
+            base += j * stride
+            weights = [w * s for w in weights for s in (1 - t, t)]
+        u, e = 0., -1.
+        for w, corner in zip(weights, corners):
+            u += w * values[base + corner]
+            if error[base + corner] > e:        # False if nan
+                e = error[base + corner]
+        return u, (e if e >= 0 else np.inf)
+
+    def exact(self, θo, φo, Qscab, Qsaux):
+        """m or β by the full solver (nan if not converged)."""
+        return _solve_nodes(self.actual, self.control,
+                            np.atleast_2d([θo, φo, Qscab, Qsaux]))[0]
+
+    def query(self, θo, φo, Qscab, Qsaux):
+        """
+        m or β for θo, φo, Qscab, Qsaux.
+            Interpolated in the grid; solved by the full solver outside
+            the grid or if a node of the cell did not converge.
+
+        Returns
+        -------
+        u           m or β
+        error       error estimate of u (0 if exact, inf if u is nan)
+        exact       True if u was given by the full solver
+        """
+        point = (θo, φo, Qscab, Qsaux)
+        if all(lo <= p <= hi for lo, p, hi in zip(self.lo, point, self.hi)):
+            u, error = self._interpolate_point(point)
+            if u == u:      # not nan
+                return u, error, False
+        u = self.exact(*point)
+        return u, (0. if u == u else np.inf), True
+
+    def __call__(self, θo, φo, Qscab, Qsaux):
+        """m or β for θo, φo, Qscab, Qsaux, see *query*."""
+        return self.query(θo, φo, Qscab, Qsaux)[0]
+
+    def check(self, n=100, seed=0):
+        """
+        Interpolation error at n random points of the grid, compared to
+        the full solver.
+
+        Returns
+        -------
+        dict: 'max', 'rms' error, 'max_estimate' largest error estimate,
+        'underestimated' fraction of points with error > estimate
+        (over the points where map and solver give a value; nan if none)
+        """
+        rng = np.random.default_rng(seed)
+        points = rng.uniform(self.lo, self.hi, (n, len(self.axes)))
+        u, estimate = self.interpolate(points)
+        error = np.abs(u - _solve_nodes(self.actual, self.control, points))
+        ok = np.isfinite(error)
+        if not ok.any():
+            return dict.fromkeys(('max', 'rms', 'max_estimate',
+                                  'underestimated'), np.nan)
+        return {'max': np.max(error[ok]),
+                'rms': np.sqrt(np.mean(error[ok]**2)),
+                'max_estimate': np.max(estimate[ok]),
+                'underestimated': np.mean(error[ok] > estimate[ok])}
+
+
+def build(model, control, θo, φo, Qscab, Qsaux, max_workers=None,
+          chunksize=100):
+    """
+    Control map solved by the full solver on a grid.
+
+    Parameters
+    ----------
+    model       *cool_new.MxCcRhTzBl*; self.actual gives the parameters
+                and inputs which are not on the grid (model.actual is not
+                modified)
+    control     (variable, value, sp), see *ControlMap*
+    θo, φo, Qscab, Qsaux    increasing values of the grid
+    max_workers number of worker processes; default: number of CPUs;
+                1 solves in the calling process
+    chunksize   number of nodes solved by a worker at once
+
+    Returns
+    -------
+    ControlMap
+    """
+    if control[0] not in ('m', 'β'):
+        raise ValueError(f'control variable {control[0]!r} not in '
+                         '{"m", "β"}')
+    axes = [np.asarray(ax, dtype=float) for ax in (θo, φo, Qscab, Qsaux)]
+    if any(len(ax) < 2 or np.any(np.diff(ax) <= 0) for ax in axes):
+        raise ValueError('grid axes must have 2 or more increasing values')
+    nodes = np.stack(np.meshgrid(*axes, indexing='ij'), -1).reshape(-1, 4)
+    chunks = [nodes[i:i + chunksize] for i in range(0, len(nodes), chunksize)]
+    control = (control[0], control[1], float(control[2]))
+
+    if max_workers == 1:
+        values = [_solve_nodes(model.actual, control, chunk)
+                  for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init,
+                                 initargs=(model.actual, control)) as pool:
+            values = list(pool.map(_solve, chunks))
+    values = np.concatenate(values).reshape([len(ax) for ax in axes])
+    return ControlMap(model.actual, control, axes, values)
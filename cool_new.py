@@ -34,8 +34,10 @@ Qsh           sensible heat of HC (1 unknown)
 
 """
 
+import functools
+import threading
+
 import numpy as np
-import pandas as pd
 import psychro as psy
 
 
@@ -45,7 +47,1052 @@ l = 2496e3      # J/kg, latent heat
 
 # to be used in self.m_ls / least_squares
 m_max = 100     # ks/s, max dry air mass flow rate
+m_min = 0.01    # kg/s, min dry air mass flow rate, bracket of m_ls (brentq)
+β_max = 0.999   # -, max by-pass factor, bracket of β_ls (brentq)
 θs_0 = 5        # °C, initial guess for saturation temperature
+θs_min, θs_max = -50, 99    # °C, range of θs on the saturation curve
+ws_tol = 1e-9   # kg/kg, tolerance of solve_lin in m_ls, β_ls (brentq)
+
+# names of the 17 parameters and inputs of MxCcRhTzBl.actual
+actual_labels = ('m', 'mo', 'β', 'Kθ', 'Kw', 'θo', 'φo', 'θ3', 'w3',
+                 'θIsp', 'φIsp', 'mi', 'UA', 'Qsaux', 'Qlaux', 'Qscab', 'Qlcab')
+# parameters and inputs which define the matrix A of MxCcRhTzBl.lin_model
+matrix_labels = ('m', 'mo', 'β', 'Kθ', 'Kw', 'mi', 'UA')
+# names of the 13 unknowns of MxCcRhTzBl.lin_model
+x_labels = ('θ1', 'w1', 'θ2', 'w2', 'θ3', 'w3', 'θ4', 'w4', 'θ5', 'w5',
+            'Qsc', 'Qlc', 'Qsh')
+# structured dtype of MxCcRhTzBl.actual: one float field per actual_labels
+actual_dtype = np.dtype([(k, float) for k in actual_labels])
+# adjacency matrix of the psychrometric chart (see MxCcRhTzBl.psy_chart)
+# Points           0   1  2  3  4  5       Elements
+chart_A = np.array([[-1, 1, 0, 0, 0, 1],      # MR
+                    [0, -1, 1, 0, 0, 0],      # CC
+                    [0, 0, -1, 1, -1, 0],     # MX
+                    [0, 0, 0, -1, 1, 0],      # HC
+                    [0, 0, 0, 0, -1, 1]])     # TZ
+
+# linear and scipy solvers, module-local so that *telemetry* times them
+_linalg_solve = np.linalg.solve
+
+
+def _least_squares(*args, **kwargs):
+    """*scipy.optimize.least_squares* (scipy imported when called)."""
+    from scipy.optimize import least_squares
+    return least_squares(*args, **kwargs)
+
+
+def _scipy_brentq(*args, **kwargs):
+    """*scipy.optimize.brentq* (scipy imported when called)."""
+    from scipy.optimize import brentq
+    return brentq(*args, **kwargs)
+
+
+class Actual:
+    """
+    Parameters and inputs of one operating point, by name.
+        Record of the 17 floats *actual_labels* (__slots__, no
+        __dict__); converts to and from the array (17,) of
+        *MxCcRhTzBl.actual*. For batches of points, see *as_records*.
+
+    Example
+    -------
+    >>> p = Actual.from_array(model.actual)
+    >>> p.β, p.Kw = 0.7, 1e10
+    >>> model.actual[:] = p
+    """
+    __slots__ = actual_labels
+
+    def __init__(self, *args, **kwargs):
+        values = dict(zip(actual_labels, args))
+        twice = [k for k in values if k in kwargs]
+        if twice:
+            raise TypeError(f'values given by position and keyword: {twice}')
+        values.update(kwargs)
+        if len(args) > 17 or set(values) != set(actual_labels):
+            raise ValueError('values of the 17 parameters and inputs '
+                             f'{actual_labels} needed')
+        for k in actual_labels:
+            setattr(self, k, float(values[k]))
+
+    @classmethod
+    def from_array(cls, actual):
+        """Record of an array (17,) ordered as *actual_labels*."""
+        return cls(*as_array(actual).tolist())
+
+    def __iter__(self):
+        return (getattr(self, k) for k in actual_labels)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(list(self), dtype=dtype)
+
+    def __repr__(self):
+        values = ', '.join(f'{k}={getattr(self, k)!r}' for k in actual_labels)
+        return f'Actual({values})'
+
+
+def as_records(actual):
+    """
+    Structured view of parameters and inputs, fields *actual_labels*.
+        No copy for a C-contiguous float array (..., 17): e.g.
+        as_records(model.actual)['β'] = 0.7 sets model.actual[2] and
+        as_records(actual)['UA'] is the column UA of actual (N, 17).
+
+    Returns
+    -------
+    array (...,) of *actual_dtype*
+    """
+    actual = np.ascontiguousarray(actual, dtype=float)
+    return actual.view(actual_dtype)[..., 0]
+
+
+def as_array(actual):
+    """
+    Float array (..., 17), columns ordered as *actual_labels*, of an
+    array, of a structured array of *actual_dtype* (view, no copy) or of
+    an *Actual* record.
+    """
+    actual = np.asarray(actual)
+    if actual.dtype.names is None:
+        return actual.astype(float, copy=False)
+    elif actual.dtype == actual_dtype:
+        return actual.view((float, (17,)))
+    from numpy.lib.recfunctions import structured_to_unstructured
+    return structured_to_unstructured(actual[list(actual_labels)], dtype=float)
+
+
+def lin_system(actual, θs0):
+    """
+    Stacked coefficients of the 13 equations of *MxCcRhTzBl.lin_model*.
+
+    Parameters
+    ----------
+    actual  array (N, 17): m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp,
+            mi, UA, Qsaux, Qlaux, Qscab, Qlcab for each operating point,
+            or array (N,) of *actual_dtype*
+    θs0     array (N,), °C, temperatures for which the saturation curve
+            is liniarized
+
+    Returns
+    -------
+    A       array (N, 13, 13), coefficients of unknowns
+    b       array (N, 13), vector of inputs
+    """
+    return lin_matrix(actual, θs0), lin_rhs(actual, θs0)
+
+
+def lin_matrix(actual, θs0):
+    """
+    Stacked matrices A (N, 13, 13) of *lin_system*.
+        Depend only on m, mo, β, Kθ, Kw, mi, UA (*matrix_labels*) and θs0.
+    """
+    (m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp,
+     mi, UA, Qsaux, Qlaux, Qscab, Qlcab) = as_array(actual).T
+    A = np.zeros((len(m), 13, 13))
+    # MIX
+    A[:, 0, 6], A[:, 0, 0] = (m - mo) * c, -m * c
+    A[:, 1, 7], A[:, 1, 1] = (m - mo) * l, -m * l
+    # CC Dehumidification
+    A[:, 2, 0], A[:, 2, 10], A[:, 2, 8] = (1 - β) * m * c, -1, -(1 - β) * m * c
+    A[:, 3, 1], A[:, 3, 11], A[:, 3, 9] = (1 - β) * m * l, -1, -(1 - β) * m * l
+    A[:, 4, 9], A[:, 4, 8] = 1, -psy.wsp(np.asarray(θs0, dtype=float))
+    # MIX2
+    A[:, 5, 0], A[:, 5, 8], A[:, 5, 2] = β * m * c, (1 - β) * m * c, -m * c
+    A[:, 6, 1], A[:, 6, 9], A[:, 6, 3] = β * m * l, (1 - β) * m * l, -m * l
+    # Heating
+    A[:, 7, 2], A[:, 7, 12], A[:, 7, 4] = m * c, 1, -m * c
+    A[:, 8, 3], A[:, 8, 5] = m * l, -m * l
+    # TZ & Sales Room
+    A[:, 9, 4], A[:, 9, 6] = m * c, -(m * c + mi * c + UA)
+    A[:, 10, 5], A[:, 10, 7] = m * l, -(m * l + mi * l)
+    # Controllers
+    A[:, 11, 4], A[:, 11, 10] = Kθ, 1
+    A[:, 12, 5], A[:, 12, 11] = Kw, 1
+    return A
+
+
+def lin_rhs(actual, θs0):
+    """
+    Stacked vectors of inputs b (N, 13) of *lin_system*.
+    """
+    (m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp,
+     mi, UA, Qsaux, Qlaux, Qscab, Qlcab) = as_array(actual).T
+    θs0 = np.asarray(θs0, dtype=float)
+    wo = psy.w(θo, φo)      # hum. out
+    b = np.zeros((len(m), 13))
+    # MIX
+    b[:, 0] = -mo * c * θo
+    b[:, 1] = -mo * l * wo
+    # CC Dehumidification
+    b[:, 4] = psy.w(θs0, 1) - psy.wsp(θs0) * θs0
+    # TZ & Sales Room
+    b[:, 9] = -Qscab - Qsaux - (mi * c + UA) * θo
+    b[:, 10] = -mi * l * wo - Qlcab - Qlaux
+    # Controllers
+    b[:, 11] = Kθ * θIsp
+    b[:, 12] = Kw * psy.w(θIsp, φIsp)
+    return b
+
+
+def lin_solve(actual, θs0, θ5=None):
+    """
+    Closed-form solution of *lin_system* by block elimination.
+        The latent chain (w1, ..., w5, Qlc) does not depend on the
+        sensible one; both reduce to one scalar equation, in w3 and θ3
+        respectively, and meet only in the linearized saturation row
+        θ5 = (w5 - b4) / wsp(θs0). Same result as np.linalg.solve(A, b)
+        (to round-off) without assembling A; vectorized over N points.
+
+    Parameters
+    ----------
+    actual  array (N, 17), columns ordered as *actual_labels*, or
+            array (N,) of *actual_dtype*
+    θs0     array (N,), °C, temperatures for which the saturation curve
+            is liniarized
+    θ5      array (N,), °C, θ5 imposed in place of the saturation row
+            (see *solve_newton*); default: saturation row
+
+    Returns (N, 13 unknowns)
+    ------------------------
+    x : θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5, Qsc, Qlc, Qsh
+    """
+    (m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp,
+     mi, UA, Qsaux, Qlaux, Qscab, Qlcab) = as_array(actual).T
+    θs0 = np.asarray(θs0, dtype=float)
+    wo = psy.w(θo, φo)      # hum. out
+    x = np.empty((len(m), 13))
+
+    # Latent: w4 = a4·w3 + g4 (TZ), w1 = a1·w3 + g1 (MX1), Qlc = m·l·(w1 - w3)
+    a4 = m / (m + mi)
+    g4 = (mi * wo + (Qlcab + Qlaux) / l) / (m + mi)
+    a1 = (m - mo) / m * a4
+    g1 = ((m - mo) * g4 + mo * wo) / m
+    # Kw: Kw·w3 + Qlc = Kw·wIsp
+    w3 = (Kw * psy.w(θIsp, φIsp) - m * l * g1) / (Kw + m * l * (a1 - 1))
+    x[:, 5] = x[:, 3] = w3                              # w3, w2 (HC)
+    x[:, 7] = a4 * w3 + g4                              # w4
+    x[:, 1] = w1 = a1 * w3 + g1                         # w1
+    x[:, 9] = w5 = (w3 - β * w1) / (1 - β)              # w5 (MX2)
+    x[:, 11] = m * l * (w1 - w3)                        # Qlc
+
+    # Saturation curve linearized in θs0
+    if θ5 is None:
+        wsp = psy.wsp(θs0)
+        θ5 = (w5 - psy.w(θs0, 1)) / wsp + θs0
+    x[:, 8] = θ5                                        # θ5
+
+    # Sensible: θ4 = a4·θ3 + g4 (TZ), θ1 = a1·θ3 + g1 (MX1)
+    a4 = m * c / (m * c + mi * c + UA)
+    g4 = ((mi * c + UA) * θo + Qscab + Qsaux) / (m * c + mi * c + UA)
+    a1 = (m - mo) / m * a4
+    g1 = ((m - mo) * g4 + mo * θo) / m
+    # Kθ: Kθ·θ3 + Qsc = Kθ·θIsp, Qsc = (1 - β)·m·c·(θ1 - θ5) (CC)
+    θ3 = ((Kθ * θIsp - (1 - β) * m * c * (g1 - θ5))
+          / (Kθ + (1 - β) * m * c * a1))
+    x[:, 4] = θ3                                        # θ3
+    x[:, 6] = a4 * θ3 + g4                              # θ4
+    x[:, 0] = θ1 = a1 * θ3 + g1                         # θ1
+    x[:, 2] = θ2 = β * θ1 + (1 - β) * θ5                # θ2 (MX2)
+    x[:, 10] = (1 - β) * m * c * (θ1 - θ5)              # Qsc
+    x[:, 12] = m * c * (θ3 - θ2)                        # Qsh (HC)
+    return x
+
+
+@functools.lru_cache(maxsize=256)
+def lu_factor(key):
+    """
+    LU factorization of the matrix A of *lin_model*, cached.
+        A is factorized for the saturation curve linearized in θs_0;
+        for another θs0, A differs only by A[4, 8] = -wsp(θs0), a
+        rank-1 update solved by Sherman-Morrison with z = A⁻¹·e4
+        (see *MxCcRhTzBl.lin_model_rhs*), so that the factorization is
+        valid for all the saturation iterations.
+
+    Parameters
+    ----------
+    key     tuple: m, mo, β, Kθ, Kw, mi, UA (*matrix_labels*)
+
+    Returns
+    -------
+    lu      lu, piv of *scipy.linalg.lu_factor(A)* for θs0 = θs_0
+    z       array (13,), A⁻¹·e4
+    """
+    from scipy.linalg import lu_factor, lu_solve
+
+    actual = np.zeros((1, 17))
+    actual[0, [actual_labels.index(k) for k in matrix_labels]] = key
+    lu = lu_factor(lin_matrix(actual, [θs_0])[0])
+    e4 = np.zeros(13)
+    e4[4] = 1
+    return lu, lu_solve(lu, e4)
+
+
+_local = threading.local()      # assembly buffers of lin_model, per thread
+
+
+def lin_model(actual, θs0):
+    """
+    Linearized model.
+        Solves a set of 13 linear equations.
+        Saturation curve is linearized in θs0.
+        Stateless: may be called concurrently from several threads.
+
+    s-point (θs, ws):
+
+    - is on a tangent to φ = 100 % in θs0;
+
+    - is **not** on the saturation curve (Apparatus Dew Point ADP).
+
+
+    Parameters
+    ----------
+    actual  array (17,): m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp,
+            mi, UA, Qsaux, Qlaux, Qscab, Qlcab (*actual_labels*), or
+            *Actual* record
+    θs0     °C, temperature for which the saturation curve is liniarized
+
+    Equations (13)
+    -------------
+    +-------------+-----+----+-----+----+----+----+----+----+
+    | Element     | MX1 | CC/DEHUM | MIX2 | HC | TZ | Kθ | Kw |
+    +=============+=====+====+=====+====+====+====+====+====+
+    | N° equations|  2  |   3     |  2   |  2  | 2 | 1  |  1 |
+    +-------------+-----+----+-----+----+----+----+----+----+
+
+    Returns (13 unknowns)
+    ---------------------
+    x : θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5,
+        Qsc, Qlc, Qsh,
+    """
+    """
+    <=4================================m==========================
+           ||                                                   ||
+           4 (m-mo) =======0=======                             ||
+           ||       ||     β m   ||                             ||
+   θo,φo=>[MX1]==0==||          [MX2]==2==[HC]==F==3==>[TZ]==4==||
+     mo             ||           ||        /   /       //       |
+                    ===0=[CC]==1===       s   m       sl        |
+                         /\\   (1-β)m     |           ||        |
+                        t  sl             |          [BL]<-mi   |
+                        |                 |          //         |
+                        |                 |         sl          |
+                        |                 |                     |
+                        |                 |<------[K]-----------+<-wI
+                        |<------------------------[K]-----------+<-θI
+        """
+    A, b = _assemble(actual, θs0)
+    x = _linalg_solve(A, b)
+    return x
+
+
+def _assemble(actual, θs0):
+    """
+    Coefficients A, b of *lin_model(actual, θs0)* in preallocated buffers
+    of the calling thread.
+        The part which does not depend on θs0 is rebuilt only if actual
+        changed since the previous call in this thread; row 4, the
+        saturation curve linearized in θs0, is patched in place.
+    """
+    actual = as_array(actual)
+    try:
+        A, b, key = _local.A, _local.b, _local.key
+    except AttributeError:
+        A, b = _local.A, _local.b = np.zeros((13, 13)), np.zeros(13)
+        key = _local.key = np.full(17, np.nan)      # actual of A, b
+    if not np.array_equal(key, actual):
+        _assemble_constant(actual.tolist(), A, b)
+        key[:] = actual
+    wsp = psy.wsp(θs0)
+    A[4, 8], b[4] = -wsp, psy.w(θs0, 1) - wsp * θs0
+    return A, b
+
+
+def _assemble_constant(actual, A, b):
+    """
+    Fills the buffers A, b with the coefficients of the 13 equations of
+    *lin_model* which depend only on actual.
+    """
+   #List of parameters and inputs put into actual set (floats: cheaper
+   #scalar arithmetic than numpy scalars)
+    m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp, mi, UA, Qsaux, Qlaux, Qscab, Qlcab = actual
+    wo = psy.w(θo, φo)      # hum. out
+   #Set of 13 equations 
+    A.fill(0)   # coefficents of unknowns
+    b.fill(0)   # vector of inputs
+    #MIX
+    A[0,6], A[0,0], b[0] = (m-mo) * c, -m * c, -mo * c * θo
+    A[1,7], A[1,1], b[1] = (m-mo) * l, -m * l, -mo * l * wo
+    #CC Dehumidification
+    A[2,0], A[2,10], A[2,8], b[2] = (1 - β) * m * c, -1, -(1 - β) * m * c, 0
+    A[3,1], A[3,11], A[3,9], b[3] = (1 - β) * m * l, -1, -(1 - β) * m * l, 0  
+    A[4,9] = 1              # A[4,8], b[4] depend on θs0, see _assemble
+    #MIX2
+    A[5,0], A[5,8], A[5,2], b[5] = β * m * c, (1 - β) * m * c, -m * c, 0
+    A[6,1], A[6,9], A[6,3], b[6] = β * m * l, (1 - β) * m * l, -m * l, 0  
+    #Heating
+    A[7,2], A[7,12], A[7,4], b[7] = m * c, 1, -m * c, 0
+    A[8,3], A[8,5], b[8] = m * l, -m * l, 0
+    #TZ & Sales Room
+    A[9,4], A[9,6], b[9] = m * c, -(m * c + mi * c + UA), -Qscab - Qsaux - (mi * c + UA) * θo
+    A[10,5], A[10,7], b[10] = m * l, -(m * l + mi * l), -mi * l * wo - Qlcab - Qlaux
+    # #Controller 
+    A[11,4], A[11, 10], b[11] = Kθ, 1, Kθ * θIsp
+    
+    A[12,5], A[12, 11], b[12] = Kw, 1, Kw * psy.w(θIsp, φIsp)
+    # Controllers chatGPT
+    # A[11,4], A[11,12], b[11] = Kθ, -1, Kθ * θIsp
+    # A[12,5], A[12,11], b[12] = Kw, -1, Kw * psy.w(θIsp, φIsp)
+
+
+def solve_lin(actual, θs0, method='substitution', full_output=False,
+              tol=0.01e-3, max_iter=100, relax=1, fallback=True):
+    """
+    Finds saturation point on saturation curve ws = f(θs).
+        method='substitution':
+        Solves iterativelly *lin_model(actual, θs0)*:
+        θs -> θs0 until ws = psy(θs, 1).
+        θs is clipped to [θs_min, θs_max] and the update of θs0 is
+        relaxed by relax; if the residual changes sign without
+        decreasing (oscillation), relax is halved. The iterations stop
+        after max_iter, if relax < 1/64 (oscillation) or if θs is nan or
+        twice out of [θs_min, θs_max] (divergence); with fallback,
+        *solve_newton* is then tried from θs0.
+        method='newton':
+        see *solve_newton(actual, θs0)*.
+
+    Parameters
+    ----------
+    actual      array (17,), parameters and inputs (*actual_labels*)
+    θs0         initial guess saturation temperature
+    method      'substitution' or 'newton'
+    full_output True: returns also info
+    tol         kg/kg, tolerance on |psy.w(θs, 1) - ws|
+    max_iter    maximum number of *lin_model* solves
+    relax       relaxation factor of θs, 0 < relax <= 1
+    fallback    True: *solve_newton* if substitution does not converge
+
+    Returns (13 unknowns)
+    ---------------------
+    x of *lin_model(actual, θs0)*
+    info        if full_output, dict:
+                'nit' number of iterations,
+                'converged' True if |psy.w(θs, 1) - ws| <= tol,
+                'status' 'converged', 'max_iter', 'oscillating' or
+                'diverged' (of substitution if the fallback failed),
+                'residual' psy.w(θs, 1) - ws,
+                'method' method of the solution
+    """
+    if method == 'newton':
+        x, info = solve_newton(actual, θs0, tol, max_iter)
+        return (x, info) if full_output else x
+    elif method != 'substitution':
+        raise ValueError(f'method {method!r} not in '
+                         '{"substitution", "newton"}')
+
+    #linearization of saturation points, we want to get 100% relative humidity at point 5
+    θs_init = θs0
+    r0 = np.inf     # kg/kg, residual psy.w(θs, 1) - ws of the previous iteration
+    out = False     # θs of the previous iteration out of [θs_min, θs_max]
+    status = 'max_iter'
+    for nit in range(1, max_iter + 1):
+        x = lin_model(actual, θs0)
+        θs = x[8]                       # x[8] is theta 5
+        if np.isnan(θs) or (out and not θs_min <= θs <= θs_max):
+            r, status = np.nan, 'diverged'
+            break
+        out = not θs_min <= θs <= θs_max
+        θs = min(max(θs, θs_min), θs_max)
+        r = psy.w(θs, 1) - x[9]         # psy.w(θs, 1) = ws
+        if abs(r) <= tol and not out:
+            status = 'converged'
+            break
+        if r * r0 < 0 and abs(r) >= abs(r0):    # oscillation: damping
+            relax /= 2
+            if relax < 1 / 64:
+                status = 'oscillating'
+                break
+        θs0 += relax * (θs - θs0)       # actualize θs0
+        r0 = r
+    info = {'nit': nit, 'converged': status == 'converged',
+            'status': status, 'residual': r, 'method': 'substitution'}
+
+    if not info['converged'] and fallback:
+        x_n, info_n = solve_newton(actual, θs_init, tol, max_iter)
+        if info_n['converged']:
+            x = x_n
+            info.update(info_n, nit=nit + info_n['nit'], method='newton')
+    return (x, info) if full_output else x
+
+
+def solve_newton(actual, θs0, tol=0.01e-3, max_iter=50):
+    """
+    Finds saturation point on saturation curve ws = f(θs) by Newton.
+        With the saturation row of *lin_model* replaced by θs = τ,
+        the 12 other equations stay linear, so that
+        x(τ) = x0 + τ·x1 is obtained from one call of the closed form
+        *lin_solve* for τ = 0 and τ = 1 (no LAPACK call). Newton's
+        method is then applied to the scalar residual
+        r(τ) = psy.w(τ, 1) - ws(τ) with r'(τ) = psy.wsp(τ) - x1[9]
+        (x1[9] = 0: w5 does not depend on τ, so each iteration only
+        evaluates psy.w and psy.wsp); τ is clipped to [θs_min, θs_max].
+
+    Parameters
+    ----------
+    actual      array (17,), parameters and inputs (*actual_labels*)
+    θs0         initial guess saturation temperature
+    tol         kg/kg, tolerance on |r(τ)|
+    max_iter    maximum number of Newton iterations
+
+    Returns (13 unknowns)
+    ---------------------
+    x           θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5, Qsc, Qlc, Qsh
+                for θ5 = τ
+    info        dict: 'nit' number of Newton iterations,
+                'converged' True if |r(τ)| <= tol,
+                'status' 'converged', 'max_iter' or 'diverged' (τ nan or
+                twice out of [θs_min, θs_max]), 'residual' r(τ),
+                'method' 'newton'
+    """
+    x0, x1 = lin_solve(np.broadcast_to(as_array(actual), (2, 17)),
+                       np.zeros(2), θ5=np.array([0., 1.]))
+    x1 = x1 - x0                        # x(τ) = x0 + τ·x1
+
+    τ = float(θs0)
+    r = psy.w(τ, 1) - (x0[9] + τ * x1[9])
+    nit = 0
+    while abs(r) > tol and nit < max_iter:
+        τ_new = τ - r / (psy.wsp(τ) - x1[9])
+        nit += 1
+        if np.isnan(τ_new) or (τ in (θs_min, θs_max)
+                               and not θs_min < τ_new < θs_max):
+            r = np.nan                  # twice out of [θs_min, θs_max]
+            break
+        τ = min(max(τ_new, θs_min), θs_max)
+        r = psy.w(τ, 1) - (x0[9] + τ * x1[9])
+    status = ('converged' if abs(r) <= tol else
+              'diverged' if np.isnan(r) else 'max_iter')
+    return x0 + τ * x1, {'nit': nit, 'converged': status == 'converged',
+                         'status': status, 'residual': r, 'method': 'newton'}
+
+
+def sensitivity(actual, x):
+    """
+    Sensitivities dx/dp of converged solutions to the 17 parameters and
+    inputs, from the linear system of *lin_model*.
+        At convergence θs0 = θ5: A of *lin_matrix(actual, θ5)*, with the
+        saturation row linearized in θ5, is the Jacobian of the 13
+        equations in which w5 = psy.w(θ5, 1), so that the coupling of θ5
+        and w5 through the saturation curve is exact. With
+        R(x, p) = A·x - b, dx/dp = A⁻¹(∂b/∂p - ∂A/∂p·x) = -A⁻¹·∂R/∂p,
+        solved for the 17 columns with one factorization of A per
+        point; vectorized over N points.
+
+    Parameters
+    ----------
+    actual  array (N, 17) or (17,), parameters and inputs (*actual_labels*)
+            or array of *actual_dtype*
+    x       array (N, 13) or (13,), converged solutions of *solve_lin*,
+            *MxCcRhTzBl.solve_lin_batch*, *m_ls*, ... (*x_labels*)
+
+    Returns
+    -------
+    dx_dp   array (N, 13, 17) or (13, 17), dx_dp[..., i, j] = dx[i]/dp[j]
+            for x[i] in *x_labels* and p[j] in *actual_labels*; the set
+            points θ3, w3 of *m_ls*, *β_ls* are not in the equations
+            (zero columns)
+
+    Example
+    -------
+    >>> x = solve_lin(actual, θs_0, tol=1e-9)
+    >>> pd.DataFrame(sensitivity(actual, x), x_labels, actual_labels)
+    """
+    x = np.asarray(x, dtype=float)
+    actual, X = np.atleast_2d(as_array(actual)), np.atleast_2d(x)
+    (m, mo, β, Kθ, Kw, θo, φo, _, _, θIsp, φIsp,
+     mi, UA, Qsaux, Qlaux, Qscab, Qlcab) = actual.T
+    θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5, Qsc, Qlc, Qsh = X.T
+    wo = psy.w(θo, φo)
+    dwo_dθ, dwo_dφ = psy.dw(θo, φo)
+    dwI_dθ, dwI_dφ = psy.dw(θIsp, φIsp)
+    j = dict(zip(actual_labels, range(17)))
+
+    R = np.zeros((len(X), 13, 17))      # ∂R/∂p, R = A·x - b
+    # MIX
+    R[:, 0, j['m']] = c * (θ4 - θ1)
+    R[:, 0, j['mo']] = c * (θo - θ4)
+    R[:, 0, j['θo']] = mo * c
+    R[:, 1, j['m']] = l * (w4 - w1)
+    R[:, 1, j['mo']] = l * (wo - w4)
+    R[:, 1, j['θo']] = mo * l * dwo_dθ
+    R[:, 1, j['φo']] = mo * l * dwo_dφ
+    # CC Dehumidification (row 4, saturation: no parameter)
+    R[:, 2, j['m']] = (1 - β) * c * (θ1 - θ5)
+    R[:, 2, j['β']] = -m * c * (θ1 - θ5)
+    R[:, 3, j['m']] = (1 - β) * l * (w1 - w5)
+    R[:, 3, j['β']] = -m * l * (w1 - w5)
+    # MIX2
+    R[:, 5, j['m']] = c * (β * θ1 + (1 - β) * θ5 - θ2)
+    R[:, 5, j['β']] = m * c * (θ1 - θ5)
+    R[:, 6, j['m']] = l * (β * w1 + (1 - β) * w5 - w2)
+    R[:, 6, j['β']] = m * l * (w1 - w5)
+    # Heating
+    R[:, 7, j['m']] = c * (θ2 - θ3)
+    R[:, 8, j['m']] = l * (w2 - w3)
+    # TZ & Sales Room
+    R[:, 9, j['m']] = c * (θ3 - θ4)
+    R[:, 9, j['mi']] = c * (θo - θ4)
+    R[:, 9, j['UA']] = θo - θ4
+    R[:, 9, j['θo']] = mi * c + UA
+    R[:, 9, j['Qsaux']] = R[:, 9, j['Qscab']] = 1
+    R[:, 10, j['m']] = l * (w3 - w4)
+    R[:, 10, j['mi']] = l * (wo - w4)
+    R[:, 10, j['θo']] = mi * l * dwo_dθ
+    R[:, 10, j['φo']] = mi * l * dwo_dφ
+    R[:, 10, j['Qlaux']] = R[:, 10, j['Qlcab']] = 1
+    # Controllers
+    R[:, 11, j['Kθ']] = θ3 - θIsp
+    R[:, 11, j['θIsp']] = -Kθ
+    R[:, 12, j['Kw']] = w3 - psy.w(θIsp, φIsp)
+    R[:, 12, j['θIsp']] = -Kw * dwI_dθ
+    R[:, 12, j['φIsp']] = -Kw * dwI_dφ
+
+    dx_dp = -_linalg_solve(lin_matrix(actual, θ5), R)
+    return dx_dp[0] if x.ndim == 1 else dx_dp
+
+
+# mass flow rate optimization
+def m_ls(actual, value, sp, θs0=θs_0, method='least_squares', xtol=1e-6,
+         bracket=None, full_output=False):
+    """
+    Mass flow rate m controls supply temperature θS or indoor humidity wI.
+        Finds m which solves value = sp, i.e. minimizes ε = value - sp.
+        method='least_squares':
+        Uses *scipy.optimize.least_squares* to solve the non-linear system.
+        method='brentq':
+        Brent's method on the signed residual value - sp in a bracket of
+        [m_min, m_max], see *_brentq*.
+        Stateless: actual is not modified.
+
+    Parameters
+    ----------
+    actual  array (17,), parameters and inputs (*actual_labels*);
+            actual[0] = m is the initial guess
+    value   string: 'θS' od 'φI' type of controlled variable
+    sp      float: value of setpoint
+#decimal numbers for set point eg. 21.65
+    θs0     initial guess saturation temperature
+    method  'least_squares' or 'brentq'
+    xtol    kg/s, tolerance on m (brentq)
+    bracket (m_a, m_b) first bracket tried (brentq), e.g. info['bracket']
+            of the previous call
+    full_output True: returns also info
+
+    Calls
+    -----
+    *ε(m)*  gives (value - sp) to be minimized for m
+#calculates the residuals between the observed data and the values predicted by the model
+    Returns (13 unknowns)
+    ---------------------
+    x           given by *solve_lin(actual, θs0)*
+    actual      copy of actual with m found (and Kw = 0 for 'φI')
+    info        if full_output, dict: 'nfev' number of *solve_lin* calls,
+                'converged' (search and saturation iterations of x),
+                'bracket' (brentq); else a message is printed if not
+                converged
+    """
+#least_squares function will try to find the parameters that minimize the sum of the squares of these residual                    
+    actual = np.array(actual, dtype=float)
+
+    def ε(m):
+        """
+        Gives difference ε = (values - sp) function of m
+            ε  calculated by solve_lin(actual, θs0)
+            m   bounds=(0, m_max); m_max hard coded (global variable)
+
+        Parameters
+        ----------
+        m : mass flow rate of dry air
+
+        Returns
+        -------
+        ε = value - sp: difference between value and its set point
+        """
+        #Set point to point 3 
+        actual[0] = m[0]    #the 0 parameter from actual is m
+        x = solve_lin(actual, θs0)
+        if value == 'θS':
+            θS = x[4]       # supply air
+            return abs(sp - θS)
+        elif value == 'φI':
+            wI = x[5]       # indoor air
+            return abs(sp - wI)
+        else:
+            print('ERROR in ε(m): value not in {"θS", "wI"}')
+
+    m0 = actual[0]     # initial guess m0 = m
+    if value == 'φI':
+        actual[4] = 0  #humidity to 0 
+        sp = psy.w(actual[7], sp) #function of set point theta 3
+    if method == 'brentq':
+        # same acceptance as least_squares: cost = ε²/2 < 0.1e-3
+        ftol, tol = (2 * 0.1e-3)**0.5, ws_tol
+        actual[0], info = _brentq(_residual(actual, 0, value, sp, θs0), m0,
+                                  m_min, m_max, xtol, ftol, bracket)
+    elif method == 'least_squares':
+        # gives m for min(θSsp - θS); θs_0 is the initial guess of θs
+        res = _least_squares(ε, m0, bounds=(0, m_max)) #solves nonlinear least-squares problem
+        actual[0], tol = res.x[0], 0.01e-3
+        info = {'nfev': res.nfev + res.njev,    # njev: 1 call each (2-point)
+                'converged': bool(res.cost < 0.1e-3)} #cost of solution, is it good enaugh
+    else:
+        raise ValueError(f'method {method!r} not in '
+                         '{"least_squares", "brentq"}')
+
+    x, info_s = solve_lin(actual, θs0, full_output=True, tol=tol)
+    if method == 'brentq':      # acceptance on the x returned
+        k = 4 if value == 'θS' else 5
+        info['converged'] = bool(abs(x[k] - sp) <= ftol)
+    info['converged'] = info['converged'] and info_s['converged']
+    if not info['converged'] and not full_output:   # else: info
+        print('RecAirVAV: No solution for m') #if solution doesn't fulfill quality of calculation accuracy
+    return (x, actual, info) if full_output else (x, actual)
+
+
+def β_ls(actual, value, sp, θs0=θs_0, method='least_squares', xtol=1e-6,
+         bracket=None, full_output=False, β0=0.1):
+    """
+    Bypass β controls supply temperature θS or indoor humidity wI.
+        Finds β which solves value = sp, i.e. minimizes ε = value - sp.
+        method='least_squares':
+        Uses *scipy.optimize.least_squares* to solve the non-linear system.
+        method='brentq':
+        Brent's method on the signed residual value - sp in a bracket of
+        [0, β_max], see *_brentq*.
+        Stateless: actual is not modified.
+
+    Parameters
+    ----------
+    actual  array (17,), parameters and inputs (*actual_labels*)
+    value   string: 'θS' od 'φI' type of controlled variable
+    sp      float: value of setpoint
+    θs0     initial guess saturation temperature
+    method  'least_squares' or 'brentq'
+    xtol    tolerance on β (brentq)
+    bracket (β_a, β_b) first bracket tried (brentq), e.g. info['bracket']
+            of the previous call
+    full_output True: returns also info
+    β0      initial guess of β, e.g. actual[2] for a warm start
+
+    Calls
+    -----
+    *ε(β)*  gives (value - sp) to be minimized for β
+
+    Returns (13 unknowns)
+    ---------------------
+    x           given by *solve_lin(actual, θs0)*
+    actual      copy of actual with β found (and Kw = 0 for 'φI')
+    info        if full_output, dict: 'nfev' number of *solve_lin* calls,
+                'converged' (search and saturation iterations of x),
+                'bracket' (brentq); else a message is printed if not
+                converged
+    """
+    actual = np.array(actual, dtype=float)
+
+    def ε(β):
+        """
+        Gives difference ε = (values - sp) function of β
+            ε  calculated by solve_lin(actual, θs0)
+            β   bounds=(0, 1)
+
+        Parameters
+        ----------
+        β : by-pass factor of the cooling coil
+
+        Returns
+        -------
+        ε = value - sp: difference between value and its set point
+        """
+        actual[2] = β[0]
+        x = solve_lin(actual, θs0)
+        if value == 'θS':
+            θS = x[4]       # supply air
+            return abs(sp - θS)
+        elif value == 'φI':
+            wI = x[5]       # indoor air
+            return abs(sp - wI)
+        else:
+            print('ERROR in ε(β): value not in {"θS", "wI"}')
+
+    if value == 'φI':
+        actual[4] = 0
+        sp = psy.w(actual[7], sp)
+    if method == 'brentq':
+        # same acceptance as least_squares: cost = ε²/2 < 1e-5
+        ftol, tol = (2 * 1e-5)**0.5, ws_tol
+        actual[2], info = _brentq(_residual(actual, 2, value, sp, θs0), β0,
+                                  0, β_max, xtol, ftol, bracket)
+    elif method == 'least_squares':
+        # gives m for min(θSsp - θS); θs_0 is the initial guess of θs
+        res = _least_squares(ε, β0, bounds=(0, 1))
+        actual[2], tol = res.x[0], 0.01e-3
+        info = {'nfev': res.nfev + res.njev,    # njev: 1 call each (2-point)
+                'converged': bool(res.cost < 1e-5)}
+    else:
+        raise ValueError(f'method {method!r} not in '
+                         '{"least_squares", "brentq"}')
+
+    x, info_s = solve_lin(actual, θs0, full_output=True, tol=tol)
+    if method == 'brentq':      # acceptance on the x returned
+        k = 4 if value == 'θS' else 5
+        info['converged'] = bool(abs(x[k] - sp) <= ftol)
+    info['converged'] = info['converged'] and info_s['converged']
+    if not info['converged'] and not full_output:   # else: info
+        print('RecAirVBP: No solution for β')
+    return (x, actual, info) if full_output else (x, actual)
+
+
+def optimize(actual, θs0=θs_0, bounds=None, mo_min=None, sp_tol=None,
+             ftol=1e-6, max_iter=100, full_output=False):
+    """
+    Mass flow rate m, by-pass β and outdoor air mo of minimum coil energy.
+        Minimizes E = |Qsc| + |Qsh| over (m, β, mo) by SLSQP with the
+        bounds, mo <= m and the indoor set points met:
+        |θ3 - θIsp| <= sp_tol[0] and |w3 - w(θIsp, φIsp)| <= sp_tol[1]
+        (met by the controllers if Kθ, Kw are large, up to their steady
+        offsets |Qsc| / Kθ and |Qlc| / Kw). The gradients of E
+        and of the constraints are given by *sensitivity*. Each
+        (m, β, mo) is solved once by *solve_lin* for the objective and
+        the constraints, warm-started from the θs of the previous solve
+        (cold if it does not converge). Stateless: actual is not
+        modified.
+
+    Parameters
+    ----------
+    actual      array (17,), parameters and inputs (*actual_labels*);
+                m, β, mo are the initial guess, e.g. the values found for
+                the previous hour
+    θs0         initial guess saturation temperature
+    bounds      dict {'m': (lo, hi), 'β': (lo, hi), 'mo': (lo, hi)}
+                replacing the defaults (m_min, m_max), (0, β_max),
+                (mo_min, m_max)
+    mo_min      kg/s, default lower bound of mo, the minimum outdoor air
+                (ventilation); None: mo of actual
+    sp_tol      °C, kg/kg, tolerances on the indoor set points; default:
+                0.01 °C, 0.01e-3 kg/kg plus twice the offsets of the
+                controllers at the initial guess (about 1e-5 kg/kg for
+                Kw = 1e9 in summer, so that the set point can be met)
+    ftol        kW, tolerance on E
+    max_iter    maximum number of SLSQP iterations
+    full_output True: returns also info
+
+    Returns (13 unknowns)
+    ---------------------
+    x           given by *solve_lin(actual, θs0)*
+    actual      copy of actual with m, β, mo found
+    info        if full_output, dict: 'nfev' number of *solve_lin*
+                calls, 'nit' SLSQP iterations, 'converged', 'status'
+                message of SLSQP, 'E' coil energy W; else a message is
+                printed if not converged
+    """
+    from scipy.optimize import minimize
+
+    actual = np.array(actual, dtype=float)
+    i = [actual_labels.index(k) for k in ('m', 'β', 'mo')]
+    if mo_min is None:
+        mo_min = actual[1]
+    limits = {'m': (m_min, m_max), 'β': (0, β_max), 'mo': (mo_min, m_max)}
+    limits.update(bounds or {})
+    wIsp = psy.w(actual[9], actual[10])
+    cache = {}      # (m, β, mo): x, dx/d(m, β, mo)
+    θs = [θs0]      # warm start: θs of the previous solve
+
+    def solve(u):
+        key = tuple(u)
+        if key not in cache:
+            actual[i] = u
+            x, info = solve_lin(actual, θs[-1], full_output=True)
+            if not info['converged']:       # warm start from far away
+                x, info = solve_lin(actual, θs0, full_output=True)
+            if info['converged'] and θs_min <= x[8] <= θs_max:
+                θs.append(x[8])
+                cache[key] = x, sensitivity(actual, x)[:, i]
+            else:               # s-point out of the saturation curve
+                cache[key] = np.full(13, np.nan), np.full((13, 3), np.nan)
+        return cache[key]
+
+    if sp_tol is None:
+        x0, _ = solve(actual[i])
+        offset = np.nan_to_num(np.abs(x0[[10, 11]]) / actual[[3, 4]])
+        sp_tol = np.array([0.01, 0.01e-3]) + 2 * offset
+
+    def energy(u):
+        x, dx = solve(u)
+        sign = np.sign(x[[10, 12]])
+        return (sign @ x[[10, 12]] / 1000,          # kW
+                sign @ dx[[10, 12]] / 1000)
+
+    def set_points(u):
+        x, _ = solve(u)
+        e = np.array([x[4] - actual[9], x[5] - wIsp]) / sp_tol
+        return np.concatenate([1 - e, 1 + e])
+
+    def set_points_jac(u):
+        _, dx = solve(u)
+        de = dx[[4, 5]] / np.reshape(sp_tol, (2, 1))
+        return np.concatenate([-de, de])
+
+    constraints = [{'type': 'ineq', 'fun': set_points, 'jac': set_points_jac},
+                   {'type': 'ineq', 'fun': lambda u: u[0] - u[2],  # mo <= m
+                    'jac': lambda u: np.array([1., 0, -1])}]
+    res = minimize(energy, actual[i], jac=True, method='SLSQP',
+                   bounds=[limits[k] for k in ('m', 'β', 'mo')],
+                   constraints=constraints,
+                   options={'ftol': ftol, 'maxiter': max_iter})
+    x, _ = solve(res.x)
+    converged = bool(res.success and np.all(set_points(res.x) >= -1e-6))
+    info = {'nfev': len(cache), 'nit': res.nit, 'converged': converged,
+            'status': res.message, 'E': 1000 * energy(res.x)[0]}
+    if not converged and not full_output:
+        print('optimize: No solution for m, β, mo')
+    actual[i] = res.x
+    return (x, actual, info) if full_output else (x, actual)
+
+
+def _residual(actual, i, value, sp, θs0):
+    """
+    Signed residual f(u) = value - sp as a function of actual[i] = u.
+        Each call solves *solve_lin* to the tolerance *ws_tol*,
+        warm-started from the θs of the previous call (tight enough for
+        f not to depend on the order of the calls); f(u) = nan if
+        *solve_lin* does not converge (e.g. s-point out of the saturation
+        curve, -50 ... 100 °C). actual is modified.
+    """
+    if value not in ('θS', 'φI'):
+        raise ValueError(f'value {value!r} not in {{"θS", "φI"}}')
+    k = 4 if value == 'θS' else 5       # supply air θS or indoor air wI
+    θs = θs0
+
+    def f(u):
+        nonlocal θs
+        actual[i] = u
+        try:
+            x, info = solve_lin(actual, θs, full_output=True, tol=ws_tol)
+        except np.linalg.LinAlgError:
+            return np.nan
+        if not info['converged']:       # e.g. s-point out of the curve
+            θs = θs0
+            return np.nan
+        θs = x[8]
+        return x[k] - sp
+    return f
+
+
+def _brentq(f, u0, lo, hi, xtol, ftol, bracket=None):
+    """
+    Root of the signed residual f(u) in [lo, hi] by Brent's method.
+        The search starts with bracket, default u0 ± 1 % of [lo, hi]; if
+        it fails from a given bracket, it is repeated from the default.
+        While f does not change sign, the end with the smaller |f| is
+        moved past the secant root of f (at least by the width of the
+        bracket) until f changes sign or [lo, hi] is reached (at most
+        50 moves). An end where f is not defined (nan) is moved back to
+        the nearest point where f is defined. The values of f are cached, so that the ends
+        of the bracket are not recomputed by *scipy.optimize.brentq*.
+        The root is accepted if |f(u)| <= ftol (a change of sign may
+        also be a pole of f).
+
+    Returns
+    -------
+    u           root (if not converged, end of the last bracket with
+                min |f|)
+    info        dict: 'nfev' number of calls of f, 'converged',
+                'bracket' narrow bracket around u for the next call
+    """
+    fu = {}
+
+    def f_cached(u):
+        if u not in fu:
+            fu[u] = f(u)
+        return fu[u]
+
+    def defined(u, v):
+        """Nearest point to u, toward v, where f is defined."""
+        for k in range(10, -1, -1):
+            if not np.isnan(f_cached(u)):
+                break
+            u = u + (v - u) / 2**k
+        return u
+
+    def search(bracket, lo, hi):
+        """Root u, converged, search interval [lo, hi] from bracket."""
+        a, b = max(bracket[0], lo), min(bracket[1], hi)
+        a, b = defined(a, (a + b) / 2), defined(b, (a + b) / 2)
+        for n in range(50):
+            if f_cached(a) * f_cached(b) <= 0:      # change of sign
+                break
+            if (a <= lo and b >= hi) or n == 49:
+                return (b if abs(fu[b]) < abs(fu[a]) else a), False, lo, hi
+            # end e moved away from the other end o, toward the bound
+            if (abs(fu[b]) <= abs(fu[a]) and b < hi) or a <= lo:
+                e, o, bound = b, a, hi
+            else:
+                e, o, bound = a, b, lo
+            step = 4 * (b - a)
+            if fu[e] != fu[o]:
+                s = e - fu[e] * (e - o) / (fu[e] - fu[o])     # secant root
+                if (s - e) * (bound - e) > 0:
+                    step = max(1.5 * abs(s - e), b - a)
+            t = e + step if bound == hi else e - step
+            t = defined(min(max(t, lo), hi), e)
+            if t == e:                          # f not defined toward bound
+                lo, hi = (lo, e) if bound == hi else (e, hi)
+            a, b = (e, t) if bound == hi else (t, e)
+        u = _scipy_brentq(f_cached, a, b, xtol=xtol)
+        return u, abs(f_cached(u)) <= ftol, lo, hi
+
+    cold = u0 - 0.01 * (hi - lo), u0 + 0.01 * (hi - lo)
+    u, converged, a, b = search(cold if bracket is None else bracket, lo, hi)
+    if not converged and bracket is not None:
+        u, converged, a, b = search(cold, lo, hi)
+    if not converged:
+        return u, {'nfev': len(fu), 'converged': False, 'bracket': (lo, hi)}
+    d = 1e-3 * (b - a)
+    return u, {'nfev': len(fu), 'converged': True,
+               'bracket': (max(u - d, a), min(u + d, b))}
+
+
+def _iterate_batch(solve, θs0, tol, max_iter):
+    """
+    Saturation iterations of N samples, each until it converges.
+        solve(active, θs0[active]) gives the rows of x of the samples
+        active (indexes) for their saturation temperatures; each pass
+        solves only the samples for which |psy.w(θs, 1) - ws| > tol. θs
+        is clipped to [θs_min, θs_max]; samples with a non-finite
+        solution (e.g. m = 0 or β = 1) are dropped as diverged.
+
+    Returns
+    -------
+    x, n_iter, converged, see *MxCcRhTzBl.solve_lin_batch*
+    """
+    θs0 = np.array(θs0, dtype=float)
+    N = len(θs0)
+    x = np.empty((N, 13))
+    n_iter = np.zeros(N, dtype=int)
+    diverged = np.zeros(N, dtype=bool)
+    active = np.arange(N)       # indexes of samples not yet converged
+    while active.size and n_iter[active[0]] < max_iter:
+        xa = solve(active, θs0[active])
+        x[active] = xa
+        n_iter[active] += 1
+        θs = np.clip(xa[:, 8], θs_min, θs_max)
+        Δ_ws = np.abs(psy.w(θs, 1) - xa[:, 9])
+        θs0[active] = θs
+        diverged[active] = ~np.isfinite(xa).all(axis=1)
+        active = active[((Δ_ws > tol) | (θs != xa[:, 8]))
+                        & ~diverged[active]]
+    converged = ~diverged
+    converged[active] = False
+    return x, n_iter, converged
+
 
 class MxCcRhTzBl:
     """
@@ -66,254 +1113,264 @@ class MxCcRhTzBl:
                                 θo, φo, θ3, w3, θIsp, φIsp,
                                 mi, UA, Qsaux, Qlaux, 
                                 Qscab, Qlcab])
+        self._brackets = {}     # brackets of m_ls, β_ls (brentq) of last call
+
+    @property
+    def record(self):
+        """
+        self.actual by name, structured view (*as_records*): e.g.
+        self.record['β'] = 0.7 sets self.actual[2].
+        """
+        return as_records(self.actual)
 
     def lin_model(self, θs0):
         """
-        Linearized model.
-            Solves a set of 16 linear equations.
-            Saturation curve is linearized in θs0.
+        Linearized model of self.actual, see *lin_model(actual, θs0)*.
+        """
+        return lin_model(self.actual, θs0)
 
-        s-point (θs, ws):
+    def lin_model_batch(self, θs0, actual=None):
+        """
+        Linearized model for N operating points in one call.
+            Same 13 equations as *lin_model(θs0)*, solved in closed form
+            for all points by *lin_solve* (block elimination, no LAPACK
+            call; *lin_system* gives the stacked A, b).
 
-        - is on a tangent to φ = 100 % in θs0;
+        Parameters
+        ----------
+        θs0     °C, array (N,) or float, temperatures for which the
+                saturation curve is liniarized
+        actual  array (N, 17), one row per operating point, columns
+                ordered as self.actual, or array (N,) of *actual_dtype*;
+                default: self.actual for every θs0
+
+        Returns (N, 13 unknowns)
+        ------------------------
+        x : θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5,
+            Qsc, Qlc, Qsh, one row per operating point
+        """
+        if actual is None:
+            actual = np.broadcast_to(self.actual, np.shape(θs0) + (17,))
+        actual = np.atleast_2d(as_array(actual))
+        θs0 = np.broadcast_to(θs0, actual.shape[:1])
+        x = lin_solve(actual, θs0)
+        return x
 
-        - is **not** on the saturation curve (Apparatus Dew Point ADP).
 
+    def lin_model_rhs(self, θs0, actual, tol=0.01e-3, max_iter=100):
+        """
+        Saturation points of N operating points sharing the matrix A.
+            A depends only on m, mo, β, Kθ, Kw, mi, UA (*matrix_labels*)
+            and, in the saturation row, on θs0. The LU factorization of
+            A for θs_0 is cached by *lu_factor*; the operating points,
+            which differ in θo, φo, θIsp, φIsp, Qsaux, Qlaux, Qscab,
+            Qlcab, are solved once as N right-hand-side columns y0.
+            The saturation iterations (*_iterate_batch*, as in
+            *solve_lin_batch*) then only update the row 4 of A and b:
+            with δ = wsp(θs0) - wsp(θs_0), y = y0 + b4·z and
+            x = y + δ·y[8] / (1 - δ·z[8])·z (Sherman-Morrison).
+            Same results as *solve_lin_batch*, which is faster with the
+            closed form *lin_solve* and is preferred, also for load and
+            weather sweeps (32 ms against 37 ms for 10 000 operating
+            points of the demo model).
 
-        Parameter from function call
-        ----------------------------
-        θs0     °C, temperature for which the saturation curve is liniarized
+        Parameters
+        ----------
+        θs0         °C, array (N,) or float, initial guess saturation
+                    temperature
+        actual      array (N, 17), columns ordered as self.actual, or
+                    array (N,) of *actual_dtype*; the columns
+                    *matrix_labels* are taken from self.actual
+        tol         kg/kg, tolerance on the humidity ratio of the s-point
+        max_iter    maximum number of iterations for each sample
 
-        Parameters from object
-        ---------------------
-        m, mo, θo, φo, θ3, w3, θIsp, φIsp, β, mi, UA, Qsaux, Qlaux, 
-        Qscab, Qlcab, Kθ, Kw = self.actual
+        Returns
+        -------
+        x           array (N, 13): θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5,
+                    Qsc, Qlc, Qsh, one row per operating point
+        n_iter      array (N,), number of saturation iterations
+        converged   array (N,) of bool, see *solve_lin_batch*
+        """
+        from scipy.linalg import lu_solve
+
+        i = [actual_labels.index(k) for k in matrix_labels]
+        actual = np.array(np.atleast_2d(as_array(actual)), dtype=float)
+        actual[:, i] = self.actual[i]
+        N = len(actual)
+        lu, z = lu_factor(tuple(self.actual[i].tolist()))
+        b = lin_rhs(actual, np.full(N, θs_0))
+        b[:, 4] = 0                     # row 4 added by b4·z
+        y0 = lu_solve(lu, b.T).T
+        wsp_0 = psy.wsp(θs_0)
+
+
+        def solve(active, θa):
+            wsp = psy.wsp(θa)
+            y = y0[active] + np.outer(psy.w(θa, 1) - wsp * θa, z)
+            δ = wsp - wsp_0
+            return y + np.outer(δ * y[:, 8] / (1 - δ * z[8]), z)
+
+        return _iterate_batch(solve, np.broadcast_to(θs0, (N,)), tol,
+                              max_iter)
+
+    def solve_lin(self, θs0, method='substitution', full_output=False,
+                  tol=0.01e-3, max_iter=100, relax=1, fallback=True):
+        """
+        Saturation point of self.actual, see *solve_lin(actual, θs0)*.
+        """
+        return solve_lin(self.actual, θs0, method, full_output, tol,
+                         max_iter, relax, fallback)
 
-        Equations (13)
-        -------------
-        +-------------+-----+----+-----+----+----+----+----+----+
-        | Element     | MX1 | CC/DEHUM | MIX2 | HC | TZ | Kθ | Kw |
-        +=============+=====+====+=====+====+====+====+====+====+
-        | N° equations|  2  |   3     |  2   |  2  | 2 | 1  |  1 |
-        +-------------+-----+----+-----+----+----+----+----+----+
+    def solve_newton(self, θs0, tol=0.01e-3, max_iter=50):
+        """
+        Saturation point of self.actual by Newton, see *solve_newton*.
+        """
+        return solve_newton(self.actual, θs0, tol, max_iter)
 
-        Returns (13 unknowns)
-        ---------------------
-        x : θ1, w1, θ2, w2, θ3, w3, θ4, w4, θ5, w5,
-            Qsc, Qlc, Qsh,
-        """
-        """
-        <=4================================m==========================
-               ||                                                   ||
-               4 (m-mo) =======0=======                             ||
-               ||       ||     β m   ||                             ||
-       θo,φo=>[MX1]==0==||          [MX2]==2==[HC]==F==3==>[TZ]==4==||
-         mo             ||           ||        /   /       //       |
-                        ===0=[CC]==1===       s   m       sl        |
-                             /\\   (1-β)m     |           ||        |
-                            t  sl             |          [BL]<-mi   |
-                            |                 |          //         |
-                            |                 |         sl          |
-                            |                 |                     |
-                            |                 |<------[K]-----------+<-wI
-                            |<------------------------[K]-----------+<-θI
-            """
-       #List of parameters and inputs put into self.actual set
-        m, mo, β, Kθ, Kw, θo, φo, θ3, w3, θIsp, φIsp, mi, UA, Qsaux, Qlaux, Qscab, Qlcab = self.actual
-        wo = psy.w(θo, φo)      # hum. out
-       #Set of 13 equations 
-        A = np.zeros((13, 13))  # coefficents of unknowns
-        b = np.zeros(13)        # vector of inputs
-        #MIX
-        A[0,6], A[0,0], b[0] = (m-mo) * c, -m * c, -mo * c * θo
-        A[1,7], A[1,1], b[1] = (m-mo) * l, -m * l, -mo * l * wo
-        #CC Dehumidification
-        A[2,0], A[2,10], A[2,8], b[2] = (1 - β) * m * c, -1, -(1 - β) * m * c, 0
-        A[3,1], A[3,11], A[3,9], b[3] = (1 - β) * m * l, -1, -(1 - β) * m * l, 0  
-        A[4,9], A[4,8], b[4] = 1, -psy.wsp(θs0), psy.w(θs0, 1) - psy.wsp(θs0) * θs0
-        #MIX2
-        A[5,0], A[5,8], A[5,2], b[5] = β * m * c, (1 - β) * m * c, -m * c, 0
-        A[6,1], A[6,9], A[6,3], b[6] = β * m * l, (1 - β) * m * l, -m * l, 0  
-        #Heating
-        A[7,2], A[7,12], A[7,4], b[7] = m * c, 1, -m * c, 0
-        A[8,3], A[8,5], b[8] = m * l, -m * l, 0
-        #TZ & Sales Room
-        A[9,4], A[9,6], b[9] = m * c, -(m * c + mi * c + UA), -Qscab - Qsaux - (mi * c + UA) * θo
-        A[10,5], A[10,7], b[10] = m * l, -(m * l + mi * l), -mi * l * wo - Qlcab - Qlaux
-        # #Controller 
-        A[11,4], A[11, 10], b[11] = Kθ, 1, Kθ * θIsp
-        
-        A[12,5], A[12, 11], b[12] = Kw, 1, Kw * psy.w(θIsp, φIsp)
-        # Controllers chatGPT
-        # A[11,4], A[11,12], b[11] = Kθ, -1, Kθ * θIsp
-        # A[12,5], A[12,11], b[12] = Kw, -1, Kw * psy.w(θIsp, φIsp)
-        x = np.linalg.solve(A, b)
-        return x
-    
-        
-    def solve_lin(self, θs0):
+    def solve_lin_batch(self, θs0, actual=None, tol=0.01e-3, max_iter=100):
         """
-        Finds saturation point on saturation curve ws = f(θs).
-            Solves iterativelly *lin_model(θs0)*:
-            θs -> θs0 until ws = psy(θs, 1).
+        Finds saturation points for N operating points at once.
+            Vectorized *solve_lin*: each pass solves *lin_model_batch* only
+            for the samples which have not yet converged, i.e. for which
+            |psy.w(θs, 1) - ws| > tol. θs is clipped to [θs_min, θs_max];
+            samples with a non-finite solution (e.g. m = 0 or β = 1) are
+            dropped as diverged.
 
         Parameters
         ----------
-        θs0     initial guess saturation temperature
+        θs0         array (N,) or float, initial guess saturation temperature
+        actual      array (N, 17), one row per operating point, columns
+                    ordered as self.actual, or array (N,) of *actual_dtype*;
+                    default: self.actual
+        tol         kg/kg, tolerance on the humidity ratio of the s-point
+        max_iter    maximum number of passes for each sample
 
-        Method from object
-        ---------------------
-        *self.lin_model(θs0)*
+        Returns
+        -------
+        x           array (N, 13) of *self.lin_model_batch*
+        n_iter      array (N,), number of *lin_model* solves of each sample
+        converged   array (N,) of bool, False if max_iter was reached or
+                    if the sample diverged
+        """
+        if actual is None:
+            actual = np.broadcast_to(self.actual, np.shape(θs0) + (17,))
+        actual = np.atleast_2d(as_array(actual))
+        N = actual.shape[0]
+        θs0 = np.broadcast_to(θs0, (N,))
+        return _iterate_batch(
+            lambda active, θa: self.lin_model_batch(θa, actual[active]),
+            θs0, tol, max_iter)
+
+    def sensitivity(self, θs0=θs_0, actual=None, tol=0.01e-3):
+        """
+        Sensitivities dx/dp of the solution to the 17 parameters and
+        inputs, see *sensitivity(actual, x)*.
 
-        Returns (13 unknowns)
-        ---------------------
-        x of *self.lin_model(self, θs0)*
-        """
-        #linearization of saturation points, we want to get 100% relative humidity at point 5
-        Δ_ws = 10e-3  # kg/kg, initial difference to start the iterations
-        while Δ_ws > 0.01e-3:
-            x = self.lin_model(θs0)
-            Δ_ws = abs(psy.w(x[8], 1) - x[9])   # psy.w(θs, 1) = ws
-            θs0 = x[8]                          # actualize θs0 x[8] is theta 5
-        return x
+        Parameters
+        ----------
+        θs0         °C, initial guess saturation temperature
+        actual      array (N, 17) or (N,) of *actual_dtype*, operating
+                    points solved by *self.solve_lin_batch*;
+                    default: self.actual, solved by *self.solve_lin*
+        tol         kg/kg, tolerance on the humidity ratio of the s-point
+
+        Returns
+        -------
+        x           array (13,) or (N, 13), solution
+        dx_dp       array (13, 17) or (N, 13, 17), rows *x_labels*,
+                    columns *actual_labels*
+        """
+        if actual is None:
+            x = self.solve_lin(θs0, tol=tol)
+            return x, sensitivity(self.actual, x)
+        x, _, _ = self.solve_lin_batch(θs0, actual, tol=tol)
+        return x, sensitivity(actual, x)
 
 # mass flow rate optimization
-    def m_ls(self, value, sp):
+    def m_ls(self, value, sp, method='least_squares', xtol=1e-6,
+             full_output=False):
         """
         Mass flow rate m controls supply temperature θS or indoor humidity wI.
-            Finds m which solves value = sp, i.e. minimizes ε = value - sp.
-            Uses *scipy.optimize.least_squares* to solve the non-linear system.
+            See *m_ls(actual, value, sp)*; if converged, self.actual is
+            updated with the m found (and Kw = 0 for 'φI'). With
+            method='brentq', the bracket of the previous converged call is
+            tried first.
 
-        Parameters
-        ----------
-        value   string: 'θS' od 'wI' type of controlled variable
-        sp      float: value of setpoint
-#decimal numbers for set point eg. 21.65
-        Calls
-        -----
-        *ε(m)*  gives (value - sp) to be minimized for m
-#calculates the residuals between the observed data and the values predicted by the model
         Returns (13 unknowns)
         ---------------------
-        x           given by *self.lin_model(self, θs0)*
-        
+        x           given by *self.solve_lin(θs_0)*
+        info        if full_output, dict of *m_ls*
         """
-#least_squares function will try to find the parameters that minimize the sum of the squares of these residual                    
-        from scipy.optimize import least_squares
-
-        def ε(m):
-            """
-            Gives difference ε = (values - sp) function of m
-                ε  calculated by self.solve_lin(ts0)
-                m   bounds=(0, m_max); m_max hard coded (global variable)
-
-            Parameters
-            ----------
-            m : mass flow rate of dry air
-
-            From object
-                Method: self.solve.lin(θs0)
-                Variables: self.actual <- m (used in self.solve.lin)
-            Returns
-            -------
-            ε = value - sp: difference between value and its set point
-            """
-            #Set point to point 3 
-            self.actual[0] = m  #the 0 parameter from self.actual is m
-            x = self.solve_lin(θs_0)
-            if value == 'θS':
-                θS = x[4]       # supply air
-                return abs(sp - θS)
-            elif value == 'φI':
-                wI = x[5]       # indoor air
-                return abs(sp - wI)
-            else:
-                print('ERROR in ε(m): value not in {"θS", "wI"}')
-
-        m0 = self.actual[0]     # initial guess m0 = m
-        if value == 'φI':
-            self.actual[4] = 0  #humidity to 0 
-            sp = psy.w(self.actual[7], sp) #function of set point theta 3
-        # gives m for min(θSsp - θS); θs_0 is the initial guess of θs
-        res = least_squares(ε, m0, bounds=(0, m_max)) #solves nonlinear least-squares problem
-
-        if res.cost < 0.1e-3: #cost of solution, is it good enaugh
-            m = float(res.x)  #if solution is good enaugh m is assigned
-            # print(f'm = {m: 5.3f} kg/s')
-        else:
-            print('RecAirVAV: No solution for m') #if solution doesn't fulfill quality of calculation accuracy
-
-        self.actual[0] = m
-
-        x = self.solve_lin(θs_0)
-        return x
-
-    def β_ls(self, value, sp):
+        x, actual, info = m_ls(self.actual, value, sp, method=method,
+                               xtol=xtol, bracket=self._brackets.get(('m', value)),
+                               full_output=True)
+        if info['converged']:
+            if 'bracket' in info:
+                self._brackets['m', value] = info['bracket']
+            self.actual[:] = actual
+        else:                   # bracket and self.actual not updated
+            self._brackets.pop(('m', value), None)
+            if not full_output:
+                print('RecAirVAV: No solution for m')
+        return (x, info) if full_output else x
+
+    def β_ls(self, value, sp, method='least_squares', xtol=1e-6,
+             full_output=False):
         """
         Bypass β controls supply temperature θS or indoor humidity wI.
-            Finds β which solves value = sp, i.e. minimizes ε = value - sp.
-            Uses *scipy.optimize.least_squares* to solve the non-linear system.
-
-        Parameters
-        ----------
-        value   string: 'θS' od 'wI' type of controlled variable
-        sp      float: value of setpoint
-
-        Calls
-        -----
-        *ε(m)*  gives (value - sp) to be minimized for m
+            See *β_ls(actual, value, sp)*; if converged, self.actual is
+            updated with the β found (and Kw = 0 for 'φI'). With
+            method='brentq', the bracket of the previous converged call is
+            tried first.
 
         Returns (13 unknowns)
         ---------------------
-        x           given by *self.lin_model(self, θs0)*
-        """
-        from scipy.optimize import least_squares
-
-        def ε(β):
-            """
-            Gives difference ε = (values - sp) function of β
-                ε  calculated by self.solve_lin(ts0)
-                β   bounds=(0, 1)
-
-            Parameters
-            ----------
-            β : by-pass factor of the cooling coil
-
-            From object
-                Method: self.solve.lin(θs0)
-                Variables: self.actual <- m (used in self.solve.lin)
-            Returns
-            -------
-            ε = value - sp: difference between value and its set point
-            """
-            self.actual[2] = β
-            x = self.solve_lin(θs_0)
-            if value == 'θS':
-                θS = x[4]       # supply air
-                return abs(sp - θS)
-            elif value == 'φI':
-                wI = x[5]       # indoor air
-                return abs(sp - wI)
-            else:
-                print('ERROR in ε(β): value not in {"θS", "wI"}')
-
-        β0 = self.actual[2]     # initial guess
-        β0 = 0.1
-        if value == 'φI':
-            self.actual[4] = 0
-            sp = psy.w(self.actual[7], sp)
-        # gives m for min(θSsp - θS); θs_0 is the initial guess of θs
-        res = least_squares(ε, β0, bounds=(0, 1))
-
-        if res.cost < 1e-5:
-            β = float(res.x)
-            # print(f'm = {m: 5.3f} kg/s')
-        else:
-            print('RecAirVBP: No solution for β')
+        x           given by *self.solve_lin(θs_0)*
+        info        if full_output, dict of *β_ls*
+        """
+        x, actual, info = β_ls(self.actual, value, sp, method=method,
+                               xtol=xtol, bracket=self._brackets.get(('β', value)),
+                               full_output=True)
+        if info['converged']:
+            if 'bracket' in info:
+                self._brackets['β', value] = info['bracket']
+            self.actual[:] = actual
+        else:                   # bracket and self.actual not updated
+            self._brackets.pop(('β', value), None)
+            if not full_output:
+                print('RecAirVBP: No solution for β')
+        return (x, info) if full_output else x
+
+    def optimize(self, bounds=None, sp_tol=None, ftol=1e-6,
+                 full_output=False):
+        """
+        Mass flow rate m, by-pass β and outdoor air mo of minimum coil
+        energy |Qsc| + |Qsh|, see *optimize(actual)*; self.actual gives
+        the initial guess (if it fails, the design m, β, mo are tried)
+        and is updated with the m, β, mo found, if converged. The
+        default lower bound of mo is the design mo (self.design).
 
-        self.actual[2] = β
-        x = self.solve_lin(θs_0)
-        return x
+        Returns (13 unknowns)
+        ---------------------
+        x           given by *self.solve_lin(θs_0)*
+        info        if full_output, dict of *optimize*
+        """
+        x, actual, info = optimize(self.actual, bounds=bounds,
+                                   mo_min=self.design[1], sp_tol=sp_tol,
+                                   ftol=ftol, full_output=True)
+        if not info['converged']:       # cold start from the design
+            actual = np.array(self.actual)
+            actual[:3] = self.design[:3]
+            x, actual, info_d = optimize(actual, bounds=bounds,
+                                         mo_min=self.design[1], sp_tol=sp_tol,
+                                         ftol=ftol, full_output=True)
+            info_d['nfev'] += info['nfev']
+            info = info_d
+        if info['converged']:
+            self.actual[:] = actual
+        elif not full_output:           # self.actual not updated
+            print('MxCcRhTzBl: No solution for m, β, mo')
+        return (x, info) if full_output else x
 
     def check_saturation(self, x):
         for i in range(0, 10, 2):  # check θ1, θ2, θ3, θ4, θ5
@@ -340,18 +1397,14 @@ class MxCcRhTzBl:
         None.
 
         """
+        import pandas as pd
+
         # Processes on psychrometric chart 
         wo = psy.w(θo, φo)
         # Points: O, s, S, I
         θ = np.append(θo, x[0:10:2])
         w = np.append(wo, x[1:10:2])
-        # Points       0   1  2  3  4  5       Elements
-        A = np.array([[-1, 1, 0, 0, 0, 1],      # MR
-                      [0, -1, 1, 0, 0, 0],      # CC
-                      [0, 0, -1, 1, -1, 0],     # MX
-                      [0, 0, 0, -1, 1, 0],      # HC
-                      [0, 0, 0, 0, -1, 1]])     # TZ
-        psy.chartA(θ, w, A)
+        psy.chartA(θ, w, chart_A)
 
         θ = pd.Series(θ)
         w = 1000 * pd.Series(w)         # kg/kg -> g/kg
@@ -424,49 +1477,52 @@ class MxCcRhTzBl:
         moisture_add = m * (w5_target - w5)
         return moisture_add
 
-θo = -3.8
-φo = 0.7
-θ3 = 24.0
-w3 = psy.w(θ3, 0.55)
-φIsp = 0.55
-θIsp = 24.0
-mi = 0.127
-UA = 675
-Qsaux = 6.124
-Qlaux = 7.44
-Qscab = -60.509
-Qlcab = -39.537
-m = 1.601  #initially 1 kg/s
-mo = m * 0.1
-β = 0.7        #initial 0.7
-Kθ = 1e9
-Kw = 1e9
-
-inputs = θo, φo, θ3, w3, θIsp, φIsp, mi, UA, Qsaux, Qlaux, Qscab, Qlcab
-parameters = m, mo, β, Kθ, Kw
-model = MxCcRhTzBl(parameters, inputs)
-x = model.solve_lin(θIsp)
-t = np.array([θo, x[0], x[2], x[4], x[6], x[8]])
-wv = np.array([psy.w(θo, φo), x[1], x[3], x[5], x[7], x[9]])
-A = np.zeros([5, len(t)])
-A[0, 0], A[0, 1], A[0, 4] = 1, -1, 1
-A[1, 1], A[1, 5] = 1, -1
-A[2, 1], A[2, 5], A[2, 2] = 1, 1, -1
-A[3, 2], A[3, 3] = 1, -1
-A[4, 3], A[4, 4] = 1, -1
-psy.chartA(t, wv, A)
-
-
-# Calculate the moisture to be added at point 5
-w5_target = psy.w(θIsp, φIsp)
-moisture_add = model.moisture_to_add(x[8], x[9], w5_target)
-print(f"Moisture to be added at point 5: {moisture_add:.4f} kg/s")
-
-x = model.solve_lin(θs_0)
-labels = ['θ1', 'w1', 'θ2', 'w2', 'θ3', 'w3', 'θ4', 'w4', 'θ5', 'w5', 'Qsc', 'Qlc', 'Qsh']
-
-for label, value in zip(labels, x):
-    if 'w' in label:
-        print(f"{label}: {value:.5f}")
-    else:
-        print(f"{label}: {value:.2f}")
\ No newline at end of file
+
+if __name__ == '__main__':
+    # demo: peak hour in January, results on the psychrometric chart
+    θo = -3.8
+    φo = 0.7
+    θ3 = 24.0
+    w3 = psy.w(θ3, 0.55)
+    φIsp = 0.55
+    θIsp = 24.0
+    mi = 0.127
+    UA = 675
+    Qsaux = 6.124
+    Qlaux = 7.44
+    Qscab = -60.509
+    Qlcab = -39.537
+    m = 1.601  #initially 1 kg/s
+    mo = m * 0.1
+    β = 0.7        #initial 0.7
+    Kθ = 1e9
+    Kw = 1e9
+
+    inputs = θo, φo, θ3, w3, θIsp, φIsp, mi, UA, Qsaux, Qlaux, Qscab, Qlcab
+    parameters = m, mo, β, Kθ, Kw
+    model = MxCcRhTzBl(parameters, inputs)
+    x = model.solve_lin(θIsp)
+    t = np.array([θo, x[0], x[2], x[4], x[6], x[8]])
+    wv = np.array([psy.w(θo, φo), x[1], x[3], x[5], x[7], x[9]])
+    A = np.zeros([5, len(t)])
+    A[0, 0], A[0, 1], A[0, 4] = 1, -1, 1
+    A[1, 1], A[1, 5] = 1, -1
+    A[2, 1], A[2, 5], A[2, 2] = 1, 1, -1
+    A[3, 2], A[3, 3] = 1, -1
+    A[4, 3], A[4, 4] = 1, -1
+    psy.chartA(t, wv, A)
+
+
+    # Calculate the moisture to be added at point 5
+    w5_target = psy.w(θIsp, φIsp)
+    moisture_add = model.moisture_to_add(x[8], x[9], w5_target)
+    print(f"Moisture to be added at point 5: {moisture_add:.4f} kg/s")
+
+    x = model.solve_lin(θs_0)
+    labels = ['θ1', 'w1', 'θ2', 'w2', 'θ3', 'w3', 'θ4', 'w4', 'θ5', 'w5', 'Qsc', 'Qlc', 'Qsh']
+
+    for label, value in zip(labels, x):
+        if 'w' in label:
+            print(f"{label}: {value:.5f}")
+        else:
+            print(f"{label}: {value:.2f}")
@@ -5,7 +5,13 @@ Created on Sun Apr  5 08:14:37 2020
 https://problemsolvingwithpython.com
 Psycrometry
 pvs(t)      pressure of saturated vapor
+dpvs(t)     derivative of pvs(t)
 v(t, r)     specific volume
+w(t, phi)   humidity ratio
+wsp(ts)     derivative of the saturation curve w(ts, 1)
+dw(t, phi)  partial derivatives of w(t, phi)
+PsychroTable    pvs, dpvs, w, wsp, v with pvs, dpvs interpolated in a table
+Chart       psychrometric chart with cached background
 
 """
 import numpy as np
@@ -16,7 +22,6 @@ def pvs(t):
     Saturation vapor pressure as a function of tempetature
     t [°C]
     """
-    import numpy as np
     T = t + 273.15      # [K] Temperature
     # pws(T) saturation pressure over liquid water
     # for temp range [0 200] °C eq. (6)
@@ -61,39 +66,158 @@ def w(t, phi, Z=0):
 
     # Static pressure function of altitude;
     p = 101325*(1 - 2.25577e-5 * Z)**5.2559     # [Pa]
-    w = Mv/Mda*phi*pvs(t)/(p - phi*pvs(t))
+    pv = phi*pvs(t)     # [Pa] vapor pressure
+    w = Mv/Mda*pv/(p - pv)
     return w
 
 
-def wsp(ts, p=101325):
+def dpvs(t):
+    """
+    Derivative of the saturation vapor pressure pvs(t) with temperature
+    t [°C]
+    """
+    T = t + 273.15      # [K] Temperature
+    C8 = -5.8002206e3
+    C10 = -4.8640239e-2
+    C11 = 4.1764768e-5
+    C12 = -1.4452093e-8
+    C13 = 6.5459673e0
+    y = pvs(t)*(-C8/T**2 + C10 + 2*C11*T + 3*C12*T**2 + C13/T)    # Pa/K
+    return y
+
+
+def wsp(ts, p=None, Z=0):
     """
     Derivative of the saturation curve for temperature ts
     Parameters
     ----------
     ts : temperature on saturation curve [°C]
-    p  : pressure [Pa]
+    p  : pressure [Pa]; default: static pressure at altitude Z
+    Z  : altitude [m]; default value = 0
 
     Returns
     -------
-    wsp : value of the derivative of the function w(ts) Tetens eq.
-    https://en.wikipedia.org/wiki/Tetens_equation
+    wsp : value of the derivative of the function w(ts, 1), consistent
+    with pvs(t) (Hyland-Wexler):
+    wsp = Mv/Mda*p*pvs'(ts)/(p - pvs(ts))**2
     """
     Mv = 18.01528       # [kg/kmol] vapor molaire mass
     Mda = 28.9645       # [kg/kmol] air molaire mass
-    exp_t = np.exp(17.2694*ts/(ts + 238.3))
-    # ws = Mv/Mda*610.78*exp_t/(p - 610.78*exp_t)
-    wp = Mv/Mda*p*2.51354e6*exp_t/((ts + 238.3)**2*(p - exp_t)**2)
+    if p is None:
+        p = 101325*(1 - 2.25577e-5 * Z)**5.2559     # [Pa]
+    wp = Mv/Mda*p*dpvs(ts)/(p - pvs(ts))**2
     return wp
 
 
+def dw(t, phi, Z=0):
+    """
+    Partial derivatives of the humidity ratio w(t, phi)
+    t : temperature [°C]
+    phi : relative humidity [-]
+    Z : altitude [m]; default value = 0
+
+    Returns
+    -------
+    dw_dt : [kg/(kg_da K)], Mv/Mda*p*phi*pvs'(t)/(p - phi*pvs(t))**2
+    dw_dphi : [kg/kg_da], Mv/Mda*p*pvs(t)/(p - phi*pvs(t))**2
+    """
+    Mv = 18.01528       # [kg/kmol] vapor molaire mass
+    Mda = 28.9645       # [kg/kmol] air molaire mass
+    p = 101325*(1 - 2.25577e-5 * Z)**5.2559     # [Pa]
+    ps = pvs(t)
+    k = Mv/Mda*p/(p - phi*ps)**2
+    return k*phi*dpvs(t), k*ps
+
+
+class PsychroTable:
+    """
+    pvs, dpvs, w, wsp, v with pvs and dpvs interpolated in a table.
+        Opt-in alternative of the exact formulas, local to the object:
+        the functions of the module are not changed. The table is a
+        uniform grid of step h on [t_min, t_max]; linear interpolation
+        keeps pvs and dpvs monotone. Temperatures out of the grid use
+        the exact formulas. The largest relative error, reached in the
+        middle of the intervals, is measured when the table is built;
+        for the default grid: 1.5e-7 for pvs, 1.2e-7 for dpvs.
+
+    Parameters
+    ----------
+    t_min, t_max : [°C] range of the grid
+    h : [K] step of the grid
+
+    Attributes
+    ----------
+    error : dict {'pvs', 'dpvs', 'w', 'wsp': max. relative error on the
+        grid}; w and wsp on the saturation curve for pvs < p/2 (the
+        error grows near the boiling point, where p - pvs -> 0)
+
+    Example
+    -------
+    >>> table = PsychroTable()
+    >>> table.w(np.linspace(-10, 40, 1000), 0.5)
+    """
+    def __init__(self, t_min=-50, t_max=100, h=0.01):
+        t = np.arange(t_min, t_max + h / 2, h)
+        self.t0, self.h, self.n = t[0], h, len(t)
+        self._pvs = pvs(t), np.diff(pvs(t))
+        self._dpvs = dpvs(t), np.diff(dpvs(t))
+        t_mid = t[:-1] + h / 2
+        t_w = t_mid[pvs(t_mid) < 101325 / 2]
+        self.error = {
+            name: float(np.max(np.abs(table(t) / exact(t) - 1)))
+            for name, table, exact, t in [
+                ('pvs', self.pvs, pvs, t_mid),
+                ('dpvs', self.dpvs, dpvs, t_mid),
+                ('w', lambda t: self.w(t, 1), lambda t: w(t, 1), t_w),
+                ('wsp', self.wsp, wsp, t_w)]}
+
+    def _lookup(self, t, table, exact):
+        """Linear interpolation in table (y, dy); exact out of the grid."""
+        y, dy = table
+        u = (np.asarray(t, dtype=float) - self.t0) * (1 / self.h)
+        if np.min(u) >= 0 and np.max(u) < self.n - 1:
+            i = u.astype(np.intp)
+            return y[i] + (u - i) * dy[i]
+        value = exact(t)
+        if np.ndim(t) == 0:
+            return value
+        inside = (u >= 0) & (u < self.n - 1)
+        i = u[inside].astype(np.intp)
+        value[inside] = y[i] + (u[inside] - i) * dy[i]
+        return value
+
+    def pvs(self, t):
+        """Saturation vapor pressure [Pa], see *pvs*."""
+        return self._lookup(t, self._pvs, pvs)
+
+    def dpvs(self, t):
+        """Derivative of pvs [Pa/K], see *dpvs*."""
+        return self._lookup(t, self._dpvs, dpvs)
+
+    def v(self, t, w, Z=0):
+        """Specific volume, see *v* (no table needed)."""
+        return v(t, w, Z)
+
+    def w(self, t, phi, Z=0):
+        """Humidity ratio [kg/kg_da], see *w*."""
+        Mv = 18.01528       # [kg/kmol] vapor molaire mass
+        Mda = 28.9645       # [kg/kmol] air molaire mass
+        p = 101325*(1 - 2.25577e-5 * Z)**5.2559     # [Pa]
+        pv = phi*self.pvs(t)    # [Pa] vapor pressure
+        return Mv/Mda*pv/(p - pv)
+
+    def wsp(self, ts, p=None, Z=0):
+        """Derivative of the saturation curve w(ts, 1), see *wsp*."""
+        Mv = 18.01528       # [kg/kmol] vapor molaire mass
+        Mda = 28.9645       # [kg/kmol] air molaire mass
+        if p is None:
+            p = 101325*(1 - 2.25577e-5 * Z)**5.2559     # [Pa]
+        return Mv/Mda*p*self.dpvs(ts)/(p - self.pvs(ts))**2
+
+
 def chart(t, w,
           t_range=np.arange(-10, 50, 0.1),
           w_range=np.arange(0, 0.030, 0.0001)):
-    print("t_range:", t_range)
-    print("type of t_range:", type(t_range))
-    print("w_range:", w_range)
-    print("type of w_range:", type(w_range))
-    chart(0, 0) 
     """
     Parameters
     ----------
@@ -131,7 +255,7 @@ def chart(t, w,
 
 def chartA(t, wv, A,
            t_range=np.arange(-10, 50, 5),
-           w_range=np.arange(0, 0.030, 0.01)):
+           w_range=np.arange(0, 0.030, 0.01), show=True):
     """
     Parameters
     ----------
@@ -148,41 +272,175 @@ def chartA(t, wv, A,
     w_range : np.arange
         humidity ration vector
         The default is np.arange(0, 0.030, 0.01).
+    show : bool
+        True: plt.show() (blocks outside of Jupyter)
 
     Returns
     -------
-    None.
+    Chart of the processes.
 
     """
     import matplotlib.pyplot as plt
-    import psychro as psy
 
-    fig = plt.figure()
-    ax = fig.add_subplot(111)
-    ax.yaxis.tick_right()
-    plt.xlabel(r'Temperature $\theta$ [°C]')
-    ax.yaxis.set_label_position("right")
-    plt.ylabel(r'Humidity ratio w [kg/kg]')
-    plt.grid(True)
-    plt.plot(t_range, psy.w(t_range, 1), linewidth=2)    # saturation curve
+    chart = Chart(A, t_range)
+    chart.update(t, wv)
+    if show:
+        plt.show()
+    return chart
 
-    # Plot relative humidity curves
-    for phi in np.arange(0, 1, 0.2):
-        w4t = psy.w(t_range, phi)
-        print(t_range)
-        print(w4t)
-        plt.plot(t_range, w4t, linewidth=0.5)
-        phi100 = phi*100
-        s_phi = "%3.0f" % phi100
-        ax.annotate(s_phi+' %', xy=(t_range[-1]-3, w4t[-1]))
-
-    for k in range(0, A.shape[0]):
-        tk = np.nonzero(A[k, :])
-        wk = np.nonzero(A[k, :])
-        plt.plot(t[tk], wv[wk], linewidth=3)    # processes
-        # plot no. point
-        for j in range(0, np.shape(tk)[1]):
-            plt.text(t[tk][j], wv[tk][j], str(tk[0][j]))
-    plt.draw()
-    plt.show()
-    return None
+
+class Chart:
+    """
+    Psychrometric chart: background drawn once, processes updated.
+        The saturation curve, the relative humidity curves and the axes
+        are the background. The processes (one line per row of A) and
+        the numbers of the points are updated by *update* for new state
+        points; with animated=True, they are blitted over the cached
+        background, so that the static parts are not rendered again.
+        *frames*, *save* and *animate* show series of states, e.g. the
+        8760 hourly states of *annual.simulate*.
+
+    Parameters
+    ----------
+    A : np.array [no. processes, no. points]
+        adjancy matrix: -1 flow out of node, 1 flow in node, 0 no connection
+    t_range : np.array
+        temperatures of the curves, °C
+    w_max : float
+        max. humidity ratio of the chart, kg/kg_da
+    animated : bool
+        True: update by blitting
+    ax : matplotlib Axes
+        default: new figure
+    """
+    def __init__(self, A, t_range=np.arange(-10, 50, 0.5), w_max=0.03,
+                 animated=False, ax=None):
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import LineCollection
+
+        if ax is None:
+            fig, ax = plt.subplots()
+        self.ax, self.fig = ax, ax.figure
+        self.A = np.asarray(A)
+        self.animated = animated
+        self._points = [np.nonzero(a)[0] for a in self.A]
+        self._background = None
+
+        # background
+        ax.yaxis.tick_right()
+        ax.yaxis.set_label_position("right")
+        ax.set_xlabel(r'Temperature $\theta$ [°C]')
+        ax.set_ylabel(r'Humidity ratio w [kg/kg]')
+        ax.grid(True)
+        ax.plot(t_range, w(t_range, 1), linewidth=2)    # saturation curve
+        for phi in np.arange(0.2, 1, 0.2):              # relative humidity
+            w4t = w(t_range, phi)
+            ax.plot(t_range, w4t, linewidth=0.5)
+            ax.annotate(f'{100 * phi:3.0f} %', xy=(t_range[-1] - 3, w4t[-1]))
+        ax.set_xlim(t_range[0], t_range[-1])
+        ax.set_ylim(0, w_max)
+
+        # processes and points
+        colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        self.processes = LineCollection(
+            [], linewidths=3, animated=animated,
+            colors=[colors[(k + 5) % len(colors)]
+                    for k in range(len(self.A))])
+        ax.add_collection(self.processes)
+        self.numbers = [ax.text(0, 0, str(j), visible=False,
+                                animated=animated)
+                        for j in range(self.A.shape[1])]
+        self.artists = [self.processes, *self.numbers]
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        """
+        Caches the background after a full draw, then draws processes
+        (if animated; else they are drawn by the full draw).
+        """
+        if not self.animated:
+            return
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def set_points(self, t, wv):
+        """Sets the processes and point numbers for the points t, wv."""
+        t, wv = np.asarray(t, dtype=float), np.asarray(wv, dtype=float)
+        self.processes.set_segments([np.column_stack([t[k], wv[k]])
+                                     for k in self._points])
+        for number, tj, wj in zip(self.numbers, t, wv):
+            number.set_position((tj, wj))
+            number.set_visible(True)
+        return self.artists
+
+    def update(self, t, wv):
+        """
+        Shows the processes for the points t [°C], wv [kg/kg_da]:
+        blitted if animated, else drawn when the canvas is idle.
+        """
+        self.set_points(t, wv)
+        canvas = self.fig.canvas
+        if not self.animated:
+            canvas.draw_idle()
+            return
+        if self._background is None:
+            canvas.draw()                   # caches background, _on_draw
+        else:
+            canvas.restore_region(self._background)
+            self._draw_artists()
+        canvas.blit(self.fig.bbox)
+
+    def frames(self, T, W):
+        """
+        RGBA images of the chart for the rows of T [°C], W [kg/kg_da]
+        (one row of points per frame), rendered by blitting.
+
+        Yields
+        ------
+        np.array (height, width, 4) of uint8
+        """
+        animated = self.animated
+        self.animated = True
+        for artist in self.artists:
+            artist.set_animated(True)
+        try:
+            for t, wv in zip(T, W):
+                self.update(t, wv)
+                yield np.asarray(self.fig.canvas.buffer_rgba()).copy()
+        finally:
+            self.animated = animated
+            for artist in self.artists:
+                artist.set_animated(animated)
+            if not animated:
+                self._background = None     # not updated by later draws
+
+    def save(self, path, T, W, fps=25):
+        """
+        Saves the frames of T, W to an animated image (by extension:
+        .webp, .gif, .png); frames are encoded one by one for .webp.
+        Needs a backend with buffer_rgba, e.g. Agg.
+        """
+        from PIL import Image
+
+        images = (Image.fromarray(frame) for frame in self.frames(T, W))
+        first = next(images)
+        first.save(path, save_all=True, append_images=images,
+                   duration=1000 / fps, loop=0)
+
+    def animate(self, T, W, interval=40, **kwargs):
+        """
+        Blitted animation of the frames of T, W on screen.
+
+        Returns
+        -------
+        matplotlib.animation.FuncAnimation (keep a reference to it)
+        """
+        from matplotlib.animation import FuncAnimation
+
+        return FuncAnimation(self.fig, lambda i: self.set_points(T[i], W[i]),
+                             frames=len(T), interval=interval, blit=True,
+                             **kwargs)
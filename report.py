@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Headless reports of scenarios of the supermarket HVAC system.
+
+The report of a scenario is the psychrometric chart of *psychro.Chart*
+(processes in one LineCollection) and the tables of the points and of
+the loads of *MxCcRhTzBl.psy_chart*, written to files instead of being
+shown and printed. The scenarios are solved by *sweep.run*, then
+rendered in the worker processes of a *ProcessPoolExecutor* with the
+Agg backend; each worker draws the background of the chart once and
+only updates the processes for its scenarios. Nothing is written to
+standard output.
+
+Formats:
+png         chart
+svg         chart
+html        chart (inline SVG) and tables
+
+Example
+-------
+>>> scenarios = sweep.grid(UA=[500, 675, 800], θo=[-5, 10, 30])
+>>> paths = run(model, scenarios, 'reports', max_workers=4)
+"""
+import html
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psychro as psy
+import cool_new as cc
+import sweep
+
+format_labels = ('png', 'svg', 'html')
+
+_chart = None       # chart of the worker process
+
+
+def points(x, θo, φo):
+    """
+    State points of a solution: outdoor point 0 and points 1 ... 5.
+
+    Parameters
+    ----------
+    x           θ1, w1, ..., θ5, w5, Qsc, Qlc, Qsh (*cool_new.x_labels*)
+    θo, φo      outdoor point
+
+    Returns
+    -------
+    θ, w        arrays of 6 temperatures °C, humidity ratios kg/kg_da
+    """
+    θ = np.append(θo, x[0:10:2])
+    w = np.append(psy.w(θo, φo), x[1:10:2])
+    return θ, w
+
+
+def tables(x, θo, φo):
+    """
+    Tables of *MxCcRhTzBl.psy_chart*.
+
+    Returns
+    -------
+    P           DataFrame of the points: θ [°C], w [g/kg]
+    Q           DataFrame of the loads Qsc, Qlc, Qsh [kW]
+    """
+    θ, w = points(x, θo, φo)
+    P = pd.DataFrame({'θ [°C]': θ, 'w [g/kg]': 1000 * w})
+    Q = pd.DataFrame([np.asarray(x[10:13]) / 1000],
+                     columns=['Qsc', 'Qlc', 'Qsh'], index=['kW'])
+    return P, Q
+
+
+def _html(name, svg, P, Q, scenario):
+    """HTML page of a report."""
+    fmt = '{:,.2f}'.format
+    return (f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8">'
+            f'<title>{html.escape(name)}</title></head>\n<body>\n'
+            f'<h1>{html.escape(name)}</h1>\n{svg}\n'
+            f'<h2>Points</h2>\n{P.to_html(float_format=fmt)}\n'
+            f'<h2>Loads</h2>\n{Q.to_html(float_format=fmt)}\n'
+            f'<h2>Scenario</h2>\n'
+            f'{scenario.to_frame().T.to_html(float_format=fmt)}\n'
+            '</body>\n</html>\n')
+
+
+def _init():
+    """Agg figure and chart of the worker process (background drawn once)."""
+    global _chart
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(tight_layout=True)
+    FigureCanvasAgg(fig)
+    _chart = psy.Chart(cc.chart_A, ax=fig.add_subplot())
+
+
+def render(name, x, θo, φo, out, scenario=None, formats=format_labels):
+    """
+    Writes the report of one scenario in the worker process.
+
+    Parameters
+    ----------
+    name        str, file name without extension
+    x           solution, *cool_new.x_labels*
+    θo, φo      outdoor point
+    out         str, directory of the reports
+    scenario    Series of the values of the scenario (html)
+    formats     subset of *format_labels*
+
+    Returns
+    -------
+    list of the paths written
+    """
+    if _chart is None:
+        _init()
+    _chart.set_points(*points(x, θo, φo))
+    _chart.ax.set_title(name)
+    svg = None
+    if {'svg', 'html'} & set(formats):
+        buffer = io.StringIO()
+        _chart.fig.savefig(buffer, format='svg')
+        svg = buffer.getvalue()
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out, f'{name}.{fmt}')
+        if fmt == 'png':
+            _chart.fig.savefig(path, format='png')
+        else:
+            if fmt == 'html':
+                P, Q = tables(x, θo, φo)
+                if scenario is None:
+                    scenario = pd.Series(dtype=float)
+                text = _html(name, svg[svg.index('<svg'):], P, Q, scenario)
+            else:
+                text = svg
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        paths.append(path)
+    return paths
+
+
+def _render(out, formats, names, X, θφ, scenarios):
+    """Renders a chunk of scenarios in the worker process."""
+    return [render(name, x, θo, φo, out, scenario, formats)
+            for name, x, (θo, φo), (_, scenario)
+            in zip(names, X, θφ, scenarios.iterrows())]
+
+
+def run(model, scenarios, out, max_workers=None, formats=format_labels,
+        chunksize=50, θs0=cc.θs_0):
+    """
+    Solves and renders the reports of the scenarios in parallel.
+
+    Parameters
+    ----------
+    model       MxCcRhTzBl, base values of the parameters and inputs
+    scenarios   DataFrame, one row per scenario, columns in
+                *cool_new.actual_labels* (θo, φo of model if not given)
+    out         str, directory of the reports (created if needed)
+    max_workers number of worker processes (default: number of CPUs)
+    formats     subset of *format_labels*
+    chunksize   number of scenarios rendered by a worker at once
+    θs0         °C, initial guess of saturation temperature
+
+    Returns
+    -------
+    DataFrame: scenarios, results of *sweep.run* and the paths of the
+    reports (one column per format); file names scenario_<index>
+    """
+    unknown = set(formats) - set(format_labels)
+    if unknown:
+        raise ValueError(f'formats {sorted(unknown)} not in {format_labels}')
+    os.makedirs(out, exist_ok=True)
+    results = sweep.run(model, scenarios, max_workers, θs0=θs0)
+    X = results[list(cc.x_labels)].to_numpy(dtype=float)
+    θφ = np.column_stack([
+        scenarios[k].to_numpy() if k in scenarios
+        else np.full(len(scenarios), model.actual[cc.actual_labels.index(k)])
+        for k in ('θo', 'φo')])
+    names = [f'scenario_{i}' for i in scenarios.index]
+
+    chunks = range(0, len(scenarios), chunksize)
+    with ProcessPoolExecutor(max_workers, initializer=_init) as pool:
+        paths = pool.map(_render, *zip(*[
+            (out, formats, names[i:i + chunksize], X[i:i + chunksize],
+             θφ[i:i + chunksize], scenarios.iloc[i:i + chunksize])
+            for i in chunks]))
+        paths = [p for chunk in paths for p in chunk]
+    paths = pd.DataFrame(paths, columns=list(formats), index=results.index)
+    return pd.concat([results, paths], axis=1)
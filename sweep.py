@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Parameter sweeps of the supermarket HVAC system for design studies.
+
+Scenarios are sets of values of some of the 17 parameters and inputs of
+*cool_new.MxCcRhTzBl* (names in *cool_new.actual_labels*, e.g. UA, mi,
+Qsaux, Qlaux, Qscab, Qlcab, β, mo); the values which are not given are
+taken from the base model. The scenarios are split in chunks solved by
+*MxCcRhTzBl.solve_lin_batch* in the worker processes of a
+*ProcessPoolExecutor*, each worker holding one model instance.
+
+Example
+-------
+>>> scenarios = grid(UA=[500, 675, 800], β=[0.5, 0.7, 0.9])
+>>> model = cc.MxCcRhTzBl(parameters, inputs)
+>>> results = run(model, scenarios, max_workers=4)
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cool_new as cc
+
+_model = None       # model of the worker process
+# names of the inputs θ3, w3 (set points) in the results, where θ3, w3 are
+# unknowns (*cool_new.x_labels*)
+sp_labels = {'θ3': 'θ3_sp', 'w3': 'w3_sp'}
+
+
+def grid(**axes):
+    """
+    Cartesian grid of scenarios.
+
+    Parameters
+    ----------
+    axes    name=values for names in *cool_new.actual_labels*
+
+    Returns
+    -------
+    DataFrame, one row per combination of values
+    """
+    import pandas as pd
+
+    rows = itertools.product(*axes.values())
+    return pd.DataFrame(list(rows), columns=list(axes))
+
+
+def _init(actual):
+    """Builds the model of the worker process."""
+    global _model
+    _model = cc.MxCcRhTzBl(actual[:5], actual[5:])
+
+
+def _solve_scenarios(model, columns, values, θs0):
+    """Solves a chunk of scenarios with model."""
+    actual = np.tile(model.actual, (len(values), 1))
+    actual[:, [cc.actual_labels.index(k) for k in columns]] = values
+    return model.solve_lin_batch(θs0, actual)
+
+
+def _solve(columns, values, θs0):
+    """*_solve_scenarios* with the model of the worker process."""
+    return _solve_scenarios(_model, columns, values, θs0)
+
+
+def run(model, scenarios, max_workers=None, chunksize=1000, θs0=cc.θs_0):
+    """
+    Solves the scenarios in parallel.
+
+    Parameters
+    ----------
+    model       *cool_new.MxCcRhTzBl*; self.actual gives the values
+                which are not set by the scenarios
+    scenarios   DataFrame or list of dict {name: value}, names in
+                *cool_new.actual_labels*
+    max_workers number of worker processes; default: number of CPUs;
+                1 solves in the calling process
+    chunksize   number of scenarios solved in one call of
+                *solve_lin_batch*
+    θs0         °C, initial guess of saturation temperature
+
+    Returns
+    -------
+    DataFrame, one row per scenario: scenario values (set points θ3, w3
+    renamed by *sp_labels*), the 13 unknowns *cool_new.x_labels*, n_iter
+    and converged
+    """
+    import pandas as pd     # not imported by the worker processes
+
+    scenarios = pd.DataFrame(scenarios).reset_index(drop=True)
+    unknown = set(scenarios.columns) - set(cc.actual_labels)
+    if unknown:
+        raise ValueError(f'unknown parameters or inputs: {sorted(unknown)}')
+
+    columns = list(scenarios.columns)
+    values = scenarios.to_numpy(dtype=float)
+    chunks = [values[i:i + chunksize]
+              for i in range(0, len(values), chunksize)]
+
+    if max_workers == 1:
+        local = cc.MxCcRhTzBl(model.actual[:5], model.actual[5:])
+        solved = [_solve_scenarios(local, columns, chunk, θs0)
+                  for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init,
+                                 initargs=(model.actual,)) as pool:
+            solved = list(pool.map(_solve, itertools.repeat(columns),
+                                   chunks, itertools.repeat(θs0)))
+
+    x, n_iter, converged = (np.concatenate(s) for s in zip(*solved))
+    results = pd.DataFrame(x, columns=cc.x_labels)
+    results['n_iter'] = n_iter
+    results['converged'] = converged
+    return pd.concat([scenarios.rename(columns=sp_labels), results], axis=1)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Counters and timers of the solvers of *cool_new* and of *psychro*.
+
+While enabled, the instrumented functions are replaced in their modules
+by wrappers which count the calls and measure the time; *disable*
+restores the original functions, so that telemetry costs nothing when
+disabled. *enable* and *disable* are counted: the telemetry is disabled
+by the *disable* matching the first *enable*. Only the functions of
+cool_new and psychro are replaced, numpy and scipy are not modified.
+The statistics are aggregated over the run (since *reset*) or collected
+for a block of code with *record*. Counted in the process (and all
+threads) in which it is enabled, e.g. not in the workers of *sweep.run*.
+
+Counters:
+lin_model               *lin_model* solves (one per sample of *lin_solve*)
+saturation_iterations   iterations of *solve_lin*, *solve_newton*,
+                        *MxCcRhTzBl.solve_lin_batch* and
+                        *MxCcRhTzBl.lin_model_rhs* (sum over samples)
+property_evals          calls of *psychro* pvs, dpvs, v, w, wsp (not
+                        counting the calls of one by another)
+property_values         values computed by these calls (array sizes)
+optimizer_nfev          *solve_lin* calls of *m_ls* and *β_ls*
+
+Timers, for each instrumented function: calls, self time (without the
+instrumented functions it calls) and total time. The calls of
+np.linalg.solve and scipy.optimize least_squares, brentq by cool_new
+are timed too (through its aliases _linalg_solve, _least_squares,
+_scipy_brentq).
+
+Example
+-------
+>>> with telemetry.record() as rec:
+...     x = model.m_ls('θS', 23, method='brentq')
+>>> rec.counters['optimizer_nfev']
+>>> rec.report()
+"""
+import contextlib
+import inspect
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psychro as psy
+import cool_new as cc
+
+counter_labels = ('lin_model', 'saturation_iterations', 'property_evals',
+                  'property_values', 'optimizer_nfev')
+
+_lock = threading.Lock()
+_local = threading.local()      # stack of the instrumented calls
+_originals = {}                 # (owner, name): original function
+_count = 0                      # enable calls not matched by disable
+
+
+class Stats:
+    """
+    Counters and timers.
+
+    Attributes
+    ----------
+    counters    dict {name in *counter_labels*: int}
+    timers      dict {function name: [calls, self time s, total time s]}
+    """
+    def __init__(self):
+        self.counters = dict.fromkeys(counter_labels, 0)
+        self.timers = {}
+
+    def copy(self):
+        stats = Stats()
+        stats.counters = dict(self.counters)
+        stats.timers = {k: list(v) for k, v in self.timers.items()}
+        return stats
+
+    def __sub__(self, other):
+        stats = self.copy()
+        for k, v in other.counters.items():
+            stats.counters[k] -= v
+        for k, v in other.timers.items():
+            stats.timers[k] = [a - b for a, b in zip(stats.timers[k], v)]
+        return stats
+
+    def report(self):
+        """
+        Returns
+        -------
+        DataFrame of the timers sorted by self time: calls, self [s],
+        total [s], self [%] of the sum of self times
+        """
+        df = pd.DataFrame.from_dict(self.timers, orient='index',
+                                    columns=['calls', 'self [s]',
+                                             'total [s]'])
+        df = df[df['calls'] > 0].sort_values('self [s]', ascending=False)
+        df['self [%]'] = 100 * df['self [s]'] / df['self [s]'].sum()
+        return df
+
+
+_stats = Stats()
+
+
+def _nit(result, args):
+    """Iterations from the info of *solve_lin*, *solve_newton*."""
+    return result[1]['nit']
+
+
+def _instrument(owner, name, counters=None, full_output=False, group=None,
+                label=None):
+    """
+    Replaces owner.name by a wrapper with counters and timers.
+
+    Parameters
+    ----------
+    owner       module or class of the function
+    name        str, name of the function
+    counters    dict {counter: extract}, the counter is incremented by
+                extract(result, args)
+    full_output True: the function is called with full_output=True to
+                extract the counters and its result is given as asked
+    group       name of the group of functions (e.g. 'psychro'); the
+                counters are not incremented for calls from the group
+    label       name of the timer; default: owner.name
+    """
+    f = getattr(owner, name)
+    label = label or f'{owner.__name__}.{name}'
+    counters = counters or {}
+    signature = inspect.signature(f) if full_output else None
+
+    def wrapper(*args, **kwargs):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        nested = group is not None and any(g == group for g, _ in stack)
+        if full_output:
+            bound = signature.bind(*args, **kwargs)
+            asked = bound.arguments.get('full_output', False)
+            bound.arguments['full_output'] = True
+            args, kwargs = bound.args, bound.kwargs
+        stack.append([group, 0.0])
+        t0 = time.perf_counter()
+        try:
+            result = f(*args, **kwargs)
+        finally:
+            dt = time.perf_counter() - t0
+            child = stack.pop()[1]
+            if stack:
+                stack[-1][1] += dt
+        increments = ({} if nested else
+                      {k: extract(result, args) for k, extract
+                       in counters.items()})
+        with _lock:
+            timer = _stats.timers.setdefault(label, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += dt - child
+            timer[2] += dt
+            for k, n in increments.items():
+                _stats.counters[k] += n
+        if full_output and not asked:
+            result = result[:-1] if len(result) > 2 else result[0]
+        return result
+
+    wrapper.__wrapped__ = f
+    _originals[owner, name] = f
+    setattr(owner, name, wrapper)
+
+
+def enable():
+    """Instruments cool_new and psychro (if not already enabled)."""
+    global _count
+    with _lock:
+        _count += 1
+        if _count == 1:
+            _enable()
+
+
+def _enable():
+    for name in ('pvs', 'dpvs', 'v', 'w', 'wsp'):
+        _instrument(psy, name, {'property_evals': lambda r, a: 1,
+                                'property_values':
+                                    lambda r, a: np.broadcast(*a).size},
+                    group='psychro')
+    _instrument(cc, 'lin_model', {'lin_model': lambda r, a: 1})
+    _instrument(cc, 'lin_solve', {'lin_model': lambda r, a: len(r)})
+    for name in ('solve_lin', 'solve_newton'):
+        _instrument(cc, name, {'saturation_iterations': _nit},
+                    full_output=(name == 'solve_lin'), group='solve_lin')
+    for name in ('solve_lin_batch', 'lin_model_rhs'):
+        _instrument(cc.MxCcRhTzBl, name,
+                    {'saturation_iterations': lambda r, a: int(np.sum(r[1]))},
+                    group='solve_lin')
+    for name in ('m_ls', 'β_ls'):
+        _instrument(cc, name, {'optimizer_nfev': lambda r, a: r[-1]['nfev']},
+                    full_output=True)
+    _instrument(cc, '_linalg_solve', label='numpy.linalg.solve')
+    _instrument(cc, '_least_squares', label='scipy.optimize.least_squares')
+    _instrument(cc, '_scipy_brentq', label='scipy.optimize.brentq')
+
+
+def disable():
+    """Restores the original functions (at the last matching call)."""
+    global _count
+    with _lock:
+        if _count == 0:
+            return
+        _count -= 1
+        if _count == 0:
+            for (owner, name), f in _originals.items():
+                setattr(owner, name, f)
+            _originals.clear()
+
+
+def enabled():
+    """True if the telemetry is enabled."""
+    return _count > 0
+
+
+def reset():
+    """Sets the counters and timers of the run to zero."""
+    global _stats
+    with _lock:
+        _stats = Stats()
+
+
+def stats():
+    """Copy of the counters and timers of the run (since *reset*)."""
+    with _lock:
+        return _stats.copy()
+
+
+def report():
+    """Timers of the run, see *Stats.report*."""
+    return stats().report()
+
+
+@contextlib.contextmanager
+def record():
+    """
+    Counters and timers of a block of code.
+        Enables the telemetry for the block (balanced *enable*, *disable*).
+
+    Yields
+    ------
+    Stats, filled at the end of the block
+    """
+    enable()
+    rec = Stats()
+    start = stats()
+    try:
+        yield rec
+    finally:
+        diff = stats() - start
+        rec.counters, rec.timers = diff.counters, diff.timers
+        disable()